@@ -0,0 +1,53 @@
+'''
+    Run a benchmark against the code of another revision
+
+    The revision is checked out in a temporary git worktree, and the
+    benchmark script of the current tree is run in a subprocess with the
+    worktree first in PYTHONPATH. The script must only use the API available
+    at that revision, and print its results as JSON, with the path of the
+    evm_cfg_builder module it imported.
+'''
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+@contextmanager
+def checkout(revision):
+    '''
+        Check out a revision in a temporary worktree
+    Args:
+        revision (str): git revision (ex: a commit, HEAD~3)
+    Returns:
+        str: path of the worktree
+    '''
+    path = tempfile.mkdtemp(prefix='evm-cfg-builder-')
+    subprocess.check_call(['git', 'worktree', 'add', '--detach', '-q', path, revision], cwd=ROOT)
+    try:
+        yield path
+    finally:
+        subprocess.check_call(['git', 'worktree', 'remove', '--force', path], cwd=ROOT)
+
+
+def run_at(revision, script, args):
+    '''
+        Run a benchmark script with the evm_cfg_builder of a revision
+    Args:
+        revision (str)
+        script (str): path of the script
+        args (list(str))
+    Returns:
+        dict: the JSON printed by the script. Its 'module' entry, the path of
+        the evm_cfg_builder imported, is checked to be in the worktree
+    '''
+    with checkout(revision) as path:
+        env = dict(os.environ, PYTHONPATH=path)
+        output = subprocess.check_output([sys.executable, script] + args, env=env)
+        result = json.loads(output.decode())
+        assert os.path.realpath(result['module']).startswith(os.path.realpath(path)), result['module']
+    return result
@@ -0,0 +1,199 @@
+'''
+    Contracts of the benchmark suite
+
+    The bundled contracts, and synthetic contracts generated with a small
+    assembler, following the patterns of solc:
+        - dispatcher_N: a dispatcher of N functions (linear comparisons of
+          the selector), all calling a shared internal function
+        - call_chain_D: external functions calling a chain of D internal
+          functions, each returning through the address pushed by its caller
+
+    The generation is deterministic, so the corpus is the same on every run.
+
+    Usage: python benchmarks/corpus.py [output directory]
+'''
+import os
+import sys
+
+from evm_cfg_builder.cfg.instruction_table import OPCODE_NAMES
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+BUNDLED = {
+    'token-runtime': os.path.join(ROOT, 'examples', 'token-runtime.evm'),
+    'fomo3d': os.path.join(ROOT, 'tests', 'fomo3d.evm'),
+    'recurse': os.path.join(ROOT, 'tests', 'recurse.evm'),
+}
+
+DISPATCHER_SIZES = [64, 256]
+CALL_CHAIN_DEPTHS = [16, 64]
+
+_OPCODES = {name: opcode for (opcode, name) in enumerate(OPCODE_NAMES) if name != 'INVALID'}
+_OPCODES['INVALID'] = 0xfe
+
+
+class Label(object):
+    '''A JUMPDEST, that can be pushed by its name'''
+
+    def __init__(self, name):
+        self.name = name
+
+
+def assemble(program):
+    '''
+        Assemble a program
+    Args:
+        program (list): Label, or (name,) / (name, operand) instructions.
+        The operand of a PUSH can be a label name (str), pushed on 2 bytes
+    Returns:
+        bytes
+    '''
+    # First pass: the address of the labels
+    labels = {}
+    pc = 0
+    for item in program:
+        if isinstance(item, Label):
+            labels[item.name] = pc
+            pc += 1
+        else:
+            name = item[0]
+            pc += 1 + (int(name[4:]) if name.startswith('PUSH') else 0)
+
+    code = bytearray()
+    for item in program:
+        if isinstance(item, Label):
+            assert labels[item.name] == len(code)
+            code.append(_OPCODES['JUMPDEST'])
+            continue
+        name = item[0]
+        code.append(_OPCODES[name])
+        if name.startswith('PUSH'):
+            size = int(name[4:])
+            operand = item[1]
+            if isinstance(operand, str):
+                operand = labels[operand]
+            code += operand.to_bytes(size, 'big')
+    return bytes(code)
+
+
+def _selector(idx):
+    # Deterministic, non-zero 4 bytes selectors
+    return (0x10000000 + idx * 0x9e3779b1) & 0xffffffff or 1
+
+
+def _dispatcher_header():
+    # if (calldatasize < 4) goto fallback
+    # selector = calldataload(0) >> 224
+    return [
+        ('PUSH1', 0x80), ('PUSH1', 0x40), ('MSTORE',),
+        ('PUSH1', 0x04), ('CALLDATASIZE',), ('LT',), ('PUSH2', 'fallback'), ('JUMPI',),
+        ('PUSH1', 0x00), ('CALLDATALOAD',), ('PUSH1', 0xe0), ('SHR',),
+    ]
+
+
+def _fallback():
+    return [Label('fallback'), ('PUSH1', 0x00), ('DUP1',), ('REVERT',)]
+
+
+def dispatcher(size):
+    '''
+        Dispatcher of `size` functions, calling a shared internal function
+    '''
+    program = _dispatcher_header()
+    for idx in range(size):
+        program += [('DUP1',), ('PUSH4', _selector(idx)), ('EQ',), ('PUSH2', 'f{}'.format(idx)), ('JUMPI',)]
+    program += _fallback()
+
+    for idx in range(size):
+        program += [
+            Label('f{}'.format(idx)),
+            # non payable
+            ('CALLVALUE',), ('DUP1',), ('ISZERO',), ('PUSH2', 'f{}_body'.format(idx)), ('JUMPI',),
+            ('PUSH1', 0x00), ('DUP1',), ('REVERT',),
+            Label('f{}_body'.format(idx)),
+            ('POP',),
+            ('PUSH2', 'f{}_ret'.format(idx)), ('PUSH1', idx & 0xff), ('PUSH2', 'shared'), ('JUMP',),
+            Label('f{}_ret'.format(idx)),
+            ('STOP',),
+        ]
+
+    # shared(x): storage[x] += 1, returns to the address under its argument
+    program += [
+        Label('shared'),
+        ('DUP1',), ('SLOAD',), ('PUSH1', 0x01), ('ADD',), ('SWAP1',), ('SSTORE',),
+        ('JUMP',),
+    ]
+    return assemble(program)
+
+
+def call_chain(depth, callers=4):
+    '''
+        `callers` external functions, each calling a chain of `depth` internal functions
+    '''
+    program = _dispatcher_header()
+    for idx in range(callers):
+        program += [('DUP1',), ('PUSH4', _selector(idx)), ('EQ',), ('PUSH2', 'f{}'.format(idx)), ('JUMPI',)]
+    program += _fallback()
+
+    for idx in range(callers):
+        program += [
+            Label('f{}'.format(idx)),
+            ('PUSH2', 'f{}_ret'.format(idx)), ('PUSH1', idx), ('PUSH2', 'internal0'), ('JUMP',),
+            Label('f{}_ret'.format(idx)),
+            ('POP',), ('STOP',),
+        ]
+
+    # internal_i(x): return internal_{i+1}(x + 1)
+    for level in range(depth):
+        program += [
+            Label('internal{}'.format(level)),
+            ('PUSH1', 0x01), ('ADD',),
+        ]
+        if level + 1 < depth:
+            program += [
+                ('PUSH2', 'internal{}_ret'.format(level)), ('SWAP1',),
+                ('PUSH2', 'internal{}'.format(level + 1)), ('JUMP',),
+                Label('internal{}_ret'.format(level)),
+            ]
+        program += [('SWAP1',), ('JUMP',)]
+    return assemble(program)
+
+
+def synthetic_contracts():
+    '''
+    Returns
+        dict: name -> bytecode
+    '''
+    contracts = {}
+    for size in DISPATCHER_SIZES:
+        contracts['dispatcher_{}'.format(size)] = dispatcher(size)
+    for depth in CALL_CHAIN_DEPTHS:
+        contracts['call_chain_{}'.format(depth)] = call_chain(depth)
+    return contracts
+
+
+def load_corpus(synthetic=True):
+    '''
+    Returns
+        dict: name -> bytecode (str for the bundled contracts, bytes for the synthetic ones)
+    '''
+    contracts = {}
+    for (name, filename) in BUNDLED.items():
+        with open(filename) as f:
+            contracts[name] = f.read()
+    if synthetic:
+        contracts.update(synthetic_contracts())
+    return contracts
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'benchmark-corpus'
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    for (name, bytecode) in synthetic_contracts().items():
+        with open(os.path.join(directory, name + '.evm'), 'w') as f:
+            f.write(bytecode.hex())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+    Benchmark of CFG.compute_reachability on synthetic contracts
+
+    The contract is a chain of N basic blocks (JUMPDEST PUSH1 1 POP), each
+    falling through the next one, so compute_simple_edges links all of them
+    and every block is reachable from the entry point.
+
+    With --baseline REV, CFG.compute_reachability of the revision REV (ex:
+    the parent of the linear reachability commit) is measured too, in a git
+    worktree (see baseline.py).
+
+    Usage: python benchmarks/reachability.py [--baseline REV] [N ...]
+'''
+import argparse
+import json
+import os
+import time
+
+import evm_cfg_builder
+from evm_cfg_builder.cfg import CFG
+
+import baseline
+
+DEFAULT_SIZES = [500, 1000, 2000, 4000]
+KEY = 1
+REPEAT = 3
+
+
+def chain_bytecode(size):
+    # JUMPDEST PUSH1 0x01 POP
+    return bytes.fromhex('5b600150' * size + '00')
+
+
+def _run(cfg):
+    best = None
+    for _ in range(REPEAT):
+        for bb in cfg.basic_blocks:
+            bb.reacheable = []
+        cfg.compute_simple_edges(KEY)
+        start = time.perf_counter()
+        cfg.compute_reachability(cfg.entry_point, KEY)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(sizes):
+    '''
+        Only uses the API available before the edge index, so that it can run
+        at older revisions
+    Returns:
+        dict: 'module', and 'results': list of (number of blocks, seconds)
+    '''
+    results = []
+    for size in sizes:
+        cfg = CFG(chain_bytecode(size), remove_metadata=False, analyze=False)
+        cfg.compute_basic_blocks()
+        results.append((len(cfg.basic_blocks), _run(cfg)))
+    return {'module': evm_cfg_builder.__file__, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reachability benchmark')
+    parser.add_argument('sizes', nargs='*', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--baseline', default=None, help='Git revision to compare with')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.sizes)))
+        return
+
+    current = measure(args.sizes)['results']
+    if args.baseline:
+        previous = baseline.run_at(args.baseline,
+                                   os.path.abspath(__file__),
+                                   ['--measure'] + [str(size) for size in args.sizes])['results']
+        print('{:>8} {:>16} {:>12}'.format('blocks', args.baseline + ' (s)', 'current (s)'))
+        for ((blocks, before), (_, after)) in zip(previous, current):
+            print('{:>8} {:>16.4f} {:>12.4f}'.format(blocks, before, after))
+    else:
+        print('{:>8} {:>12}'.format('blocks', 'current (s)'))
+        for (blocks, after) in current:
+            print('{:>8} {:>12.4f}'.format(blocks, after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+'''
+    Benchmark suite
+
+    Each benchmark is run on every contract of the corpus (see corpus.py):
+        - disassemble:        linear sweep of the bytecode
+        - create_functions:   basic blocks and function discovery
+        - analyze_functions:  value analysis of all the functions (the
+                              per-function times of the last run are saved)
+        - cfg:                full CFG construction
+        - output_to_dot:      dot export of the CFG and of the functions
+        - export_abi:         ABI export
+
+    The setup (e.g. building the CFG before the dot export) is not timed.
+    The minimum and the median of the runs are saved to a JSON file, with
+    the commit, so that the results can be compared across commits:
+
+        python benchmarks/suite.py --output before.json
+        (apply the change)
+        python benchmarks/suite.py --output after.json --compare before.json
+
+    With --compare, the exit code is 1 if a benchmark is slower than the
+    threshold.
+
+    Usage: python benchmarks/suite.py [--repeat N] [--filter NAME] [--bundled-only]
+                                      [--output FILE] [--compare FILE] [--threshold RATIO]
+'''
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from evm_cfg_builder.batch import export_functions
+from evm_cfg_builder.cfg import CFG, convert_bytecode
+from evm_cfg_builder.cfg.disassembler import disassemble
+
+import corpus
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 1.1
+
+
+def _lazy_cfg(bytecode):
+    return CFG(bytecode, compute_cfgs=False)
+
+
+def _analyze_functions(cfg):
+    cfg.analyze_functions()
+    return cfg
+
+
+def _output_to_dot(cfg):
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'contract_')
+        cfg.output_to_dot(filename)
+        for function in cfg.functions:
+            function.output_to_dot(filename)
+    finally:
+        shutil.rmtree(directory)
+
+
+# name -> (setup, run): the result of setup(bytecode) is given to run
+BENCHMARKS = {
+    'disassemble': (convert_bytecode, disassemble),
+    'create_functions': (lambda bytecode: bytecode, _lazy_cfg),
+    'analyze_functions': (_lazy_cfg, _analyze_functions),
+    'cfg': (lambda bytecode: bytecode, CFG),
+    'output_to_dot': (CFG, _output_to_dot),
+    'export_abi': (CFG, export_functions),
+}
+
+
+def run_benchmark(name, bytecode, repeat):
+    '''
+        Run a benchmark on a contract
+    Args:
+        name (str): see BENCHMARKS
+        bytecode (str, bytes)
+        repeat (int): number of runs
+    Returns:
+        dict: 'min' and 'median' in seconds, 'repeat', and for
+        analyze_functions the time of each function in the last run
+    '''
+    (setup, run) = BENCHMARKS[name]
+    times = []
+    result = None
+    for _ in range(repeat):
+        arg = setup(bytecode)
+        start = time.perf_counter()
+        result = run(arg)
+        times.append(time.perf_counter() - start)
+
+    stats = {
+        'min': min(times),
+        'median': statistics.median(times),
+        'repeat': repeat
+    }
+    if name == 'analyze_functions':
+        stats['functions'] = {function['name']: function['time']
+                              for function in result.stats.to_dict()['functions']}
+    return stats
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       cwd=corpus.ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(contracts, repeat, name_filter=None):
+    '''
+    Returns
+        dict: the environment, and 'results': contract -> benchmark -> stats
+    '''
+    results = {}
+    for (contract, bytecode) in contracts.items():
+        results[contract] = {}
+        for name in BENCHMARKS:
+            if name_filter and name_filter not in name and name_filter != contract:
+                continue
+            results[contract][name] = run_benchmark(name, bytecode, repeat)
+            print('{:<16} {:<18} {:10.6f}s'.format(contract, name, results[contract][name]['min']))
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+
+def compare(previous, current, threshold):
+    '''
+        Print the ratio of the minimum times
+    Returns:
+        list((str, str)): the (contract, benchmark) slower than the threshold
+    '''
+    regressions = []
+    print('{:<16} {:<18} {:>10} {:>10} {:>7}'.format('contract', 'benchmark', 'before', 'after', 'ratio'))
+    for (contract, benchmarks) in current['results'].items():
+        for (name, stats) in benchmarks.items():
+            before = previous['results'].get(contract, {}).get(name)
+            if before is None:
+                continue
+            ratio = stats['min'] / before['min'] if before['min'] else float('inf')
+            flag = ''
+            if ratio > threshold:
+                flag = ' slower'
+                regressions.append((contract, name))
+            print('{:<16} {:<18} {:10.6f} {:10.6f} {:7.2f}{}'.format(contract, name, before['min'],
+                                                                    stats['min'], ratio, flag))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='evm-cfg-builder benchmark suite')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Number of runs of each benchmark')
+    parser.add_argument('--filter', default=None, help='Only run the benchmarks or the contract matching the name')
+    parser.add_argument('--bundled-only', action='store_true', default=False,
+                        help='Do not run the synthetic contracts')
+    parser.add_argument('--output', default=None, help='JSON file where the results are saved')
+    parser.add_argument('--compare', default=None, help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Ratio of the minimum times above which a benchmark is a regression')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The dot export logs the unresolved jumps
+    logging.getLogger('evm-cfg-builder').setLevel(logging.CRITICAL)
+    contracts = corpus.load_corpus(synthetic=not args.bundled_only)
+    current = run_suite(contracts, args.repeat, args.filter)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(previous, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
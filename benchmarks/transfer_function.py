@@ -0,0 +1,133 @@
+'''
+    Micro-benchmark of the stack transfer function of the value analysis
+
+    Every basic block of the contract is applied on a stack of unknown
+    values, with:
+        - table:    StackValueAnalysis._transfer_func_ins (opcode dispatch table)
+        - summary:  the precompiled block summaries (Stack.apply_summary)
+
+    With --baseline REV, StackValueAnalysis._transfer_func_ins of the
+    revision REV (ex: the parent of the dispatch table commit) is measured
+    on its own Stack, in a git worktree (see baseline.py).
+
+    The cost is reported per instruction.
+
+    Usage: python benchmarks/transfer_function.py [--baseline REV] [bytecode file]
+'''
+import argparse
+import json
+import os
+import time
+
+import evm_cfg_builder
+from evm_cfg_builder.cfg import CFG
+from evm_cfg_builder.value_analysis.value_set_analysis import Stack, StackValueAnalysis
+
+import baseline
+
+DEFAULT_CONTRACT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'fomo3d.evm')
+
+# Depth of the initial stack, so that no block reaches the bottom
+STACK_DEPTH = 32
+REPEAT = 20
+
+
+def _new_stack(analysis):
+    # Before the value domain, the stack was built from the authorized values
+    if hasattr(analysis, 'domain'):
+        return Stack(analysis.domain)
+    return Stack(analysis.authorized_values)
+
+
+def _initial_stack(analysis):
+    stack = _new_stack(analysis)
+    for _ in range(STACK_DEPTH):
+        if hasattr(stack, 'push_value'):
+            stack.push_value(None)
+        else:
+            stack.push(None)
+    return stack
+
+
+def _run(blocks, count, apply_block):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for block in blocks:
+            apply_block(block)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e9 / count
+
+
+def measure(filename):
+    '''
+        Only uses the API available before the dispatch table, so that it can
+        run at older revisions
+    Returns:
+        dict: 'module', 'instructions', 'basic_blocks', and the ns/instruction of each variant
+    '''
+    with open(filename) as f:
+        cfg = CFG(f.read(), compute_cfgs=False)
+
+    basic_blocks = sorted(cfg.basic_blocks, key=lambda bb: bb.start.pc)
+    analysis = StackValueAnalysis(cfg, basic_blocks[0], 0)
+    initial = _initial_stack(analysis)
+
+    instructions = [bb.instructions for bb in basic_blocks]
+    count = sum(len(block) for block in instructions)
+
+    def new_stack():
+        stack = _new_stack(analysis)
+        stack.copy_stack(initial)
+        return stack
+
+    def apply_table(block):
+        stack = new_stack()
+        for ins in block:
+            analysis._transfer_func_ins(ins, ins.pc, stack)
+
+    result = {
+        'module': evm_cfg_builder.__file__,
+        'instructions': count,
+        'basic_blocks': len(basic_blocks),
+        'table': _run(instructions, count, apply_table)
+    }
+
+    if hasattr(Stack, 'apply_summary'):
+        from evm_cfg_builder.value_analysis.block_summary import compile_block
+        summaries = [compile_block(bb) for bb in basic_blocks]
+
+        def apply_summary(summary):
+            stack = new_stack()
+            stack.apply_summary(summary)
+
+        result['summary'] = _run(summaries, count, apply_summary)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transfer function micro-benchmark')
+    parser.add_argument('filename', nargs='?', default=DEFAULT_CONTRACT)
+    parser.add_argument('--baseline', default=None, help='Git revision to compare with')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    filename = os.path.abspath(args.filename)
+
+    if args.measure:
+        print(json.dumps(measure(filename)))
+        return
+
+    current = measure(filename)
+    print('{}: {} instructions, {} basic blocks'.format(os.path.basename(filename),
+                                                        current['instructions'],
+                                                        current['basic_blocks']))
+    if args.baseline:
+        previous = baseline.run_at(args.baseline, os.path.abspath(__file__), ['--measure', filename])
+        print('{:<24} {:8.1f} ns/instruction'.format('table ({})'.format(args.baseline), previous['table']))
+    print('{:<24} {:8.1f} ns/instruction'.format('table', current['table']))
+    print('{:<24} {:8.1f} ns/instruction'.format('summary', current['summary']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 from .cfg import *
 from evm_cfg_builder.value_analysis.value_set_analysis import StackValueAnalysis
+from evm_cfg_builder.known_hashes.resolver import SignatureResolver
+from evm_cfg_builder.batch import analyze_many
 
-__all__ = ['CFG', 'BasicBlock', 'Function', 'StackValueAnalysis', 'known_hashes']
\ No newline at end of file
+__all__ = ['CFG', 'BasicBlock', 'Function', 'StackValueAnalysis', 'SignatureResolver', 'analyze_many', 'known_hashes']
\ No newline at end of file
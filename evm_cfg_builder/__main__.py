@@ -9,9 +9,10 @@ import os
 from pkg_resources import require
 
 from crytic_compile import cryticparser, CryticCompile, InvalidCompilation, is_supported
-from .known_hashes.known_hashes import known_hashes
+from .known_hashes.resolver import SignatureResolver
 
-from .cfg import CFG
+from .cfg import CFG, AnalysisBudget
+from .batch import NO_CONTRACT_FOUND, analyze_many, export_functions
 
 logging.basicConfig()
 logger = logging.getLogger("evm-cfg-builder")
@@ -25,7 +26,43 @@ def output_to_dot(d, filename, cfg):
     for function in cfg.functions:
         function.output_to_dot(filename)
 
-def parse_args():
+def add_budget_args(parser):
+    parser.add_argument('--max-time',
+                        help='Maximum time, in seconds, of the analysis of the functions of a contract. '
+                             'The CFGs of the functions not analyzed in time are partial',
+                        action='store',
+                        type=float,
+                        dest='max_time',
+                        default=None)
+
+    parser.add_argument('--max-steps',
+                        help='Maximum number of basic block analyses for the functions of a contract',
+                        action='store',
+                        type=int,
+                        dest='max_steps',
+                        default=None)
+
+    parser.add_argument('--function-max-time',
+                        help='Maximum time, in seconds, of the analysis of a function',
+                        action='store',
+                        type=float,
+                        dest='function_max_time',
+                        default=None)
+
+    parser.add_argument('--function-max-steps',
+                        help='Maximum number of basic block analyses for a function',
+                        action='store',
+                        type=int,
+                        dest='function_max_steps',
+                        default=None)
+
+def get_budget(args):
+    limits = (args.max_time, args.max_steps, args.function_max_time, args.function_max_steps)
+    if all(limit is None for limit in limits):
+        return None
+    return AnalysisBudget(*limits)
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description='evm-cfg-builder',
                                      usage="evm-cfg-builder contract.evm [flag]")
 
@@ -50,12 +87,39 @@ def parse_args():
                         dest='disable_cfg',
                         default=False)
 
+    parser.add_argument('--jobs',
+                        help='Number of processes used to compute the CFGs of the functions',
+                        action='store',
+                        type=int,
+                        dest='jobs',
+                        default=None)
+
     parser.add_argument('--export-abi',
                         help="Export the contract's ABI",
                         action='store',
                         dest='export_abi',
                         default=None)
 
+    parser.add_argument('--signatures',
+                        help='Signature database or text file ("0xselector signature" per line) used to name the functions. Can be used multiple times',
+                        action='append',
+                        dest='signatures',
+                        default=[])
+
+    parser.add_argument('--cache-dir',
+                        help='Directory where the analysis results are cached',
+                        action='store',
+                        dest='cache_dir',
+                        default=None)
+
+    parser.add_argument('--stats',
+                        help='Export the time of the analysis phases and the counters of each function to a JSON file',
+                        action='store',
+                        dest='stats',
+                        default=None)
+
+    add_budget_args(parser)
+
     parser.add_argument('--version',
                         help='displays the current version',
                         version=require('evm-cfg-builder')[0].version,
@@ -67,19 +131,122 @@ def parse_args():
 
     cryticparser.init(parser)
 
-    if len(sys.argv) == 1:
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
         parser.print_help(sys.stderr)
         sys.exit(1)
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     return args
 
-def _run(bytecode, filename, args):
+def parse_batch_args(argv):
+    parser = argparse.ArgumentParser(description='evm-cfg-builder batch analysis',
+                                     usage="evm-cfg-builder batch source [source ...] [flag]")
+
+    parser.add_argument('sources',
+                        nargs='+',
+                        help='Directories, glob patterns, bytecode files, or JSONL files ("-" for stdin) '
+                             'of {"address": ..., "bytecode": ...} records')
+
+    parser.add_argument('--output',
+                        help='JSONL file where the results are written (default: stdout)',
+                        action='store',
+                        dest='output',
+                        default=None)
+
+    parser.add_argument('--jobs',
+                        help='Number of processes (default: one per CPU)',
+                        action='store',
+                        type=int,
+                        dest='jobs',
+                        default=None)
+
+    parser.add_argument('--timeout',
+                        help='Maximum time, in seconds, spent on one contract',
+                        action='store',
+                        type=float,
+                        dest='timeout',
+                        default=None)
+
+    parser.add_argument('--disable-optimizations',
+                        help='Disable the CFG recovery optimizations',
+                        action='store_true',
+                        dest='disable_optimizations',
+                        default=False)
 
-    optimization_enabled = False
-    if args.disable_optimizations:
-        optimization_enabled = True
+    parser.add_argument('--disable-cfg',
+                        help='Disable the CFG recovery',
+                        action='store_true',
+                        dest='disable_cfg',
+                        default=False)
+
+    parser.add_argument('--signatures',
+                        help='Signature database or text file used to name the functions. Can be used multiple times',
+                        action='append',
+                        dest='signatures',
+                        default=[])
 
-    cfg = CFG(bytecode, optimization_enabled=optimization_enabled, compute_cfgs=not args.disable_cfg)
+    parser.add_argument('--cache-dir',
+                        help='Directory where the analysis results are cached',
+                        action='store',
+                        dest='cache_dir',
+                        default=None)
+
+    parser.add_argument('--stats',
+                        help='Add the time of the analysis phases and the counters of each function to the results',
+                        action='store_true',
+                        dest='stats',
+                        default=False)
+
+    add_budget_args(parser)
+
+    return parser.parse_args(argv)
+
+def main_batch(argv):
+    args = parse_batch_args(argv)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    no_contract_found = False
+    try:
+        results = analyze_many(args.sources,
+                               workers=args.jobs,
+                               timeout=args.timeout,
+                               optimization_enabled=not args.disable_optimizations,
+                               compute_cfgs=not args.disable_cfg,
+                               signatures=args.signatures,
+                               cache_dir=args.cache_dir,
+                               stats=args.stats,
+                               budget=get_budget(args))
+        for result in results:
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            no_contract_found |= result.get('error') == NO_CONTRACT_FOUND
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if no_contract_found:
+        sys.exit(1)
+
+def _run(bytecode, filename, args, signature_resolver):
+
+    optimization_enabled = not args.disable_optimizations
+    budget = get_budget(args)
+
+    if args.cache_dir and not args.disable_cfg:
+        cfg = CFG.from_cache(bytecode,
+                             args.cache_dir,
+                             optimization_enabled=optimization_enabled,
+                             signature_resolver=signature_resolver,
+                             workers=args.jobs,
+                             budget=budget)
+    else:
+        cfg = CFG(bytecode,
+                  optimization_enabled=optimization_enabled,
+                  compute_cfgs=not args.disable_cfg,
+                  signature_resolver=signature_resolver,
+                  workers=args.jobs,
+                  budget=budget)
 
     for function in cfg.functions:
         logger.info(function)
@@ -88,21 +255,20 @@ def _run(bytecode, filename, args):
         output_to_dot(args.dot_directory, filename, cfg)
 
     if args.export_abi:
-        export = []
-        for function in cfg.functions:
-            export.append({
-                'hash_id': hex(function.hash_id),
-                'start_addr': hex(function.start_addr),
-                'signature': function.name if function.name != hex(function.hash_id) else None,
-                'attributes': function.attributes
-            })
+        export = export_functions(cfg)
 
         with open(args.export_abi, 'w') as f:
             json.dump(export, f)
 
+    return cfg
+
 
 def main():
 
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        main_batch(sys.argv[2:])
+        return
+
     l = logging.getLogger('evm-cfg-builder')
     l.setLevel(logging.INFO)
     args = parse_args()
@@ -111,6 +277,11 @@ def main():
         cp = cProfile.Profile()
         cp.enable()
 
+    signature_resolver = SignatureResolver(databases=args.signatures)
+
+    # filename -> stats of the CFG
+    stats = {}
+
     if is_supported(args.filename):
         filename = args.filename
         del args.filename
@@ -119,13 +290,16 @@ def main():
             for contract in cryticCompile.contracts_names:
                 bytecode_init = cryticCompile.bytecode_init(contract)
                 if bytecode_init:
-                    for signature, hash in cryticCompile.hashes(contract).items():
-                        known_hashes[hash] = signature
+                    contract_resolver = signature_resolver.derive({
+                        hash: signature for signature, hash in cryticCompile.hashes(contract).items()
+                    })
                     logger.info(f'Analyze {contract}')
-                    _run(bytecode_init, f'{filename}-{contract}-init', args)
+                    cfg = _run(bytecode_init, f'{filename}-{contract}-init', args, contract_resolver)
+                    stats[f'{filename}-{contract}-init'] = cfg.stats.to_dict()
                     runtime_bytecode = cryticCompile.bytecode_runtime(contract)
                     if runtime_bytecode:
-                        _run(runtime_bytecode,  f'{filename}-{contract}-runtime', args)
+                        cfg = _run(runtime_bytecode,  f'{filename}-{contract}-runtime', args, contract_resolver)
+                        stats[f'{filename}-{contract}-runtime'] = cfg.stats.to_dict()
                     else:
                         logger.info('Runtime bytecode not available')
         except InvalidCompilation as e:
@@ -135,7 +309,12 @@ def main():
         with open(args.filename, 'rb') as f:
             bytecode = f.read()
         logger.info(f'Analyze {args.filename}')
-        _run(bytecode, args.filename, args)
+        cfg = _run(bytecode, args.filename, args, signature_resolver)
+        stats[args.filename] = cfg.stats.to_dict()
+
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(stats, f, indent=2)
 
     if args.perf:
         cp.disable()
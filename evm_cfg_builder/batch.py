@@ -0,0 +1,248 @@
+'''
+    Batch analysis of many bytecodes
+
+    The inputs can be:
+        - a directory: each file is a bytecode (same format as the command line)
+        - a glob pattern (ex: "contracts/**/*.evm")
+        - a JSONL file, or "-" for stdin, with one {"address": ..., "bytecode": ...} per line
+        - a bytecode file
+
+    The contracts are analyzed in a pool of processes, and the results are
+    returned in completion order.
+'''
+import glob
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing import Pool
+
+from .cfg import CFG
+from .known_hashes.resolver import SignatureResolver
+
+logger = logging.getLogger("evm-cfg-builder")
+
+
+class AnalysisTimeout(Exception):
+    pass
+
+
+def export_functions(cfg):
+    '''
+        Export the functions of a CFG (the --export-abi format)
+    Args:
+        cfg (CFG)
+    Returns:
+        list(dict)
+    '''
+    export = []
+    for function in cfg.functions:
+        export.append({
+            'hash_id': hex(function.hash_id),
+            'start_addr': hex(function.start_addr),
+            'signature': function.name if function.name != hex(function.hash_id) else None,
+            'attributes': function.attributes
+        })
+    return export
+
+
+def export_incomplete_functions(cfg):
+    '''
+        Export the functions whose analysis stopped before its end (see AnalysisBudget)
+    Args:
+        cfg (CFG)
+    Returns:
+        list(dict): hash_id, and start pcs of the basic blocks cut off
+    '''
+    return [{'hash_id': hex(function.hash_id),
+             'cut_off': [hex(bb.start_pc) for bb in function.cut_off_blocks]}
+            for function in cfg.functions if function.incomplete]
+
+
+def _is_jsonl(source):
+    return source == '-' or source.endswith('.jsonl')
+
+
+# Error of the sources without any contract
+NO_CONTRACT_FOUND = 'no contract found'
+
+
+def _iter_jsonl(source):
+    f = sys.stdin if source == '-' else open(source)
+    try:
+        for (line_number, line) in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                item = {'address': record.get('address'), 'bytecode': record['bytecode']}
+            except (ValueError, KeyError, AttributeError) as e:
+                item = {'source': source,
+                        'line': line_number,
+                        'error': 'invalid record: {}: {}'.format(type(e).__name__, e)}
+            yield item
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _iter_source(source):
+    if _is_jsonl(source):
+        yield from _iter_jsonl(source)
+    elif os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                yield {'filename': os.path.join(root, filename)}
+    elif os.path.isfile(source):
+        yield {'filename': source}
+    else:
+        for filename in sorted(glob.glob(source, recursive=True)):
+            if os.path.isfile(filename):
+                yield {'filename': filename}
+
+
+def iter_inputs(sources):
+    '''
+        Iterate over the contracts of the sources
+
+        The invalid JSONL records, and the sources without any contract, are
+        returned as errors
+    Args:
+        sources (list(str)): directories, glob patterns, JSONL files or bytecode files
+    Returns:
+        iterator(dict): {'filename': path}, {'address': address, 'bytecode': bytecode},
+        {'source': source, 'line': line_number, 'error': error} or
+        {'source': source, 'error': NO_CONTRACT_FOUND}
+    '''
+    for source in sources:
+        found = False
+        for item in _iter_source(source):
+            found = found or 'error' not in item
+            yield item
+        if not found:
+            logger.error('No contract found for %s', source)
+            yield {'source': source, 'error': NO_CONTRACT_FOUND}
+
+
+def _timeout_handler(signum, frame):
+    raise AnalysisTimeout()
+
+
+# Options of the worker process, set by _init_worker
+_worker_options = None
+
+
+def _init_worker(options):
+    global _worker_options
+    _worker_options = dict(options)
+    _worker_options['signature_resolver'] = SignatureResolver(databases=options['signatures'])
+
+
+def _analyze_one(item):
+    '''
+        Analyze one contract
+    Args:
+        item (dict): see iter_inputs
+    Returns:
+        dict: the item (without the bytecode), with 'functions' or 'error', 'time', 'stats' if enabled,
+        and 'incomplete' if the analysis of some functions stopped (see AnalysisBudget).
+        The errors of iter_inputs are returned as is
+    '''
+    if 'error' in item:
+        return dict(item, time=0.)
+
+    options = _worker_options
+    result = {k: v for (k, v) in item.items() if k != 'bytecode'}
+
+    timeout = options['timeout']
+    # SIGALRM can only be handled in the main thread
+    use_timer = timeout and hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+    if use_timer:
+        previous_handler = signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    start = time.time()
+    try:
+        if 'filename' in item:
+            with open(item['filename'], 'rb') as f:
+                bytecode = f.read()
+        else:
+            bytecode = item['bytecode']
+        if options['cache_dir'] and options['compute_cfgs']:
+            cfg = CFG.from_cache(bytecode,
+                                 options['cache_dir'],
+                                 optimization_enabled=options['optimization_enabled'],
+                                 signature_resolver=options['signature_resolver'],
+                                 budget=options['budget'])
+        else:
+            cfg = CFG(bytecode,
+                      optimization_enabled=options['optimization_enabled'],
+                      compute_cfgs=options['compute_cfgs'],
+                      signature_resolver=options['signature_resolver'],
+                      budget=options['budget'])
+        result['functions'] = export_functions(cfg)
+        incomplete = export_incomplete_functions(cfg)
+        if incomplete:
+            result['incomplete'] = incomplete
+        if options['stats']:
+            result['stats'] = cfg.stats.to_dict()
+    except AnalysisTimeout:
+        result['error'] = 'timeout'
+    except Exception as e:  # pylint: disable=broad-except
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    result['time'] = round(time.time() - start, 6)
+    return result
+
+
+def analyze_many(sources, workers=None, timeout=None, optimization_enabled=True, compute_cfgs=True, signatures=None,
+                 cache_dir=None, stats=False, budget=None):
+    '''
+        Analyze all the contracts of the sources
+
+    Args:
+        sources (list(str)): directories, glob patterns, JSONL files ("-" for stdin) or bytecode files
+        workers (int): number of processes (default: one per CPU)
+        timeout (float): maximum time, in seconds, spent on one contract
+        optimization_enabled (bool)
+        compute_cfgs (bool)
+        signatures (list(str)): signature databases or text files, see SignatureResolver
+        cache_dir (str): directory of the analysis cache, see CFGCache
+        stats (bool): add the timers and counters of the analysis (see CFG.stats) to the results
+        budget (AnalysisBudget): limits of the analysis of each contract. Unlike timeout, the
+        contract is not dropped when they are reached, its result is flagged as incomplete
+    Returns:
+        iterator(dict): one result per contract, in completion order, and one error per
+        invalid JSONL record or source without any contract (see iter_inputs)
+    '''
+    if isinstance(sources, str):
+        sources = [sources]
+
+    options = {
+        'timeout': timeout,
+        'optimization_enabled': optimization_enabled,
+        'compute_cfgs': compute_cfgs,
+        'signatures': signatures or [],
+        'cache_dir': cache_dir,
+        'stats': stats,
+        'budget': budget
+    }
+
+    if workers == 1:
+        _init_worker(options)
+        for item in iter_inputs(sources):
+            yield _analyze_one(item)
+        return
+
+    with Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        for result in pool.imap_unordered(_analyze_one, iter_inputs(sources)):
+            yield result
@@ -1,28 +1,28 @@
 import logging
 from .basic_block import BasicBlock
+from .block_index import BlockIndex
+from .budget import AnalysisBudget
+from .edge_index import EdgeIndex
 from .function import Function
+from .instruction_table import InstructionTable
+from .stats import Stats
+from .disassembler import disassemble, BASIC_BLOCK_END
+from . import parallel
+from .cache import CFGCache
+from . import serialization
 
-__all__ = ["CFG", "BasicBlock", "Function"]
+__all__ = ["CFG", "BasicBlock", "Function", "CFGCache", "AnalysisBudget"]
 
-from ..known_hashes.known_hashes import known_hashes
+from ..known_hashes.resolver import default_resolver
 from evm_cfg_builder.value_analysis.value_set_analysis import StackValueAnalysis
 
+import io
+import mmap
 import re
-from pyevmasm import disassemble_all
+import time
 
 logger = logging.getLogger("evm-cfg-builder")
 
-BASIC_BLOCK_END = [
-    'STOP',
-    'SELFDESTRUCT',
-    'RETURN',
-    'REVERT',
-    'INVALID',
-    'SUICIDE',
-    'JUMP',
-    'JUMPI'
-]
-
 def convert_bytecode(bytecode):
     '''
         Convert the bytecode to bytes
@@ -62,11 +62,27 @@ def convert_bytecode(bytecode):
 
     return bytecode
 
+def strip_metadata(bytecode):
+    '''
+        Remove the metadata hash from the bytecode
+        see http://solidity.readthedocs.io/en/v0.4.24/metadata.html#encoding-of-the-metadata-hash-in-the-bytecode
+        Args:
+            bytecode (bytes)
+        Return:
+            (bytes)
+    '''
+    return re.sub(
+        bytes(r'\xa1\x65\x62\x7a\x7a\x72\x30\x58\x20[\x00-\xff]{32}\x00\x29'.encode('charmap')),
+        b'',
+        bytecode
+    )
+
 class CFG(object):
     """Implements the control flow graph (CFG) of an EVM bytecode.
     """
 
-    def __init__(self, bytecode=None, remove_metadata=True, analyze=True, optimization_enabled=True, compute_cfgs=True):
+    def __init__(self, bytecode=None, remove_metadata=True, analyze=True, optimization_enabled=True, compute_cfgs=True,
+                 signature_resolver=None, workers=None, budget=None):
         """Initialize an EVM CFG.
 
         :param bytecode: The EVM bytecode
@@ -75,20 +91,50 @@ class CFG(object):
         :type remove_metadata: bool
         :param analyze: Automatically analyze the bytecode
         :type analyze: bool
+        :param compute_cfgs: Compute the CFGs of all the functions. Otherwise the CFG of a function is computed on the
+        first access to its basic blocks (see analyze_functions)
+        :type compute_cfgs: bool
+        :param signature_resolver: Resolver used to name the functions (default: bundled signatures)
+        :type signature_resolver: None, SignatureResolver
+        :param workers: Number of processes used to compute the functions' CFGs (default: no worker process)
+        :type workers: None, int
+        :param budget: Limits of the functions' analyses (default: no limit)
+        :type budget: None, AnalysisBudget
         """
         self._functions = dict()
-        # __basic_blocks is a dict that matches
+        # _block_index matches
         # an address to the basic block
         # The address can be the first or the last
-        # instructions 
-        self._basic_blocks = dict()
-        self._instructions = dict()
+        # instructions
+        self._block_index = BlockIndex()
+        # Edges between the basic blocks, for all the functions
+        self._edge_index = EdgeIndex()
+        self._static_edges_computed = False
+        self._instruction_table = InstructionTable(bytes())
+        # _jumpdests_map[pc] is 1 if there is a JUMPDEST at pc
+        self._jumpdests_map = bytearray()
+        self._jumpdests = frozenset()
 
         self._optimization_enabled = optimization_enabled
 
+        if signature_resolver is None:
+            signature_resolver = default_resolver
+        self._signature_resolver = signature_resolver
+
+        self._workers = workers
+
+        self._budget = budget
+        # Time and steps spent on the functions' analyses, see AnalysisBudget
+        self._analysis_time = 0.
+        self._analysis_steps = 0
+
+        # Timers of the phases, and counters of the functions' analyses
+        self._stats = Stats()
+
         assert(isinstance(bytecode, (type(None), str, bytes)))
 
-        self._bytecode = convert_bytecode(bytecode)
+        with self._stats.timer('convert_bytecode'):
+            self._bytecode = convert_bytecode(bytecode)
 
         if remove_metadata:
             self.remove_metadata()
@@ -97,6 +143,99 @@ class CFG(object):
             if compute_cfgs:
                 self.create_cfgs()
 
+    @classmethod
+    def from_cache(cls, bytecode, cache, remove_metadata=True, optimization_enabled=True,
+                   signature_resolver=None, workers=None, budget=None):
+        """Return the CFG of the bytecode, from the cache if it was already analyzed.
+
+        On a miss, the bytecode is analyzed and the result is added to the cache,
+        unless the analysis is incomplete (see budget).
+
+        :param bytecode: The EVM bytecode
+        :type bytecode: str, bytes
+        :param cache: The cache, or its directory
+        :type cache: CFGCache, str
+        :param remove_metadata: Remove metadata before the analysis
+        :type remove_metadata: bool
+        :param signature_resolver: Resolver used to name the functions. On a hit, the names stored in the cache
+        are kept, unless a resolver is provided
+        :type signature_resolver: None, SignatureResolver
+        :param budget: Limits of the functions' analyses on a miss
+        :type budget: None, AnalysisBudget
+        :return: CFG
+        """
+        if isinstance(cache, str):
+            cache = CFGCache(cache)
+
+        bytecode = convert_bytecode(bytecode)
+        if remove_metadata:
+            bytecode = strip_metadata(bytecode)
+
+        key = cache.key(bytecode, optimization_enabled=optimization_enabled)
+        data = cache.get(key)
+        if data is not None:
+            try:
+                return cls.loads(data, signature_resolver=signature_resolver)
+            except serialization.SerializationError as e:
+                logger.error('Invalid cache entry %s: %s', key, e)
+                cache.remove(key)
+
+        cfg = cls(bytecode,
+                  remove_metadata=False,
+                  optimization_enabled=optimization_enabled,
+                  signature_resolver=signature_resolver,
+                  workers=workers,
+                  budget=budget)
+        # A partial CFG depends on the budget, and on the load of the machine
+        if not cfg.incomplete:
+            cache.put(key, cfg.dumps())
+        return cfg
+
+    def dumps(self):
+        '''
+        Serialize the CFG (see serialization.py)
+        :return: bytes
+        '''
+        return serialization.dumps(self)
+
+    def dump(self, fp):
+        '''
+        Serialize the CFG to a binary file object
+        :param fp: file object
+        :return:
+        '''
+        fp.write(self.dumps())
+
+    @classmethod
+    def loads(cls, data, signature_resolver=None):
+        '''
+        Load a CFG serialized with dumps. The CFG is not analyzed again.
+
+        :param data: the serialized CFG
+        :type data: bytes, bytearray, memoryview, mmap
+        :param signature_resolver: If set, the functions are renamed with it
+        :type signature_resolver: None, SignatureResolver
+        :return: CFG
+        '''
+        return serialization.loads(cls, data, signature_resolver=signature_resolver)
+
+    @classmethod
+    def load(cls, fp, signature_resolver=None):
+        '''
+        Load a CFG from a binary file object. Regular files are memory-mapped.
+
+        :param fp: file object
+        :param signature_resolver: If set, the functions are renamed with it
+        :type signature_resolver: None, SignatureResolver
+        :return: CFG
+        '''
+        try:
+            fileno = fp.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return cls.loads(fp.read(), signature_resolver=signature_resolver)
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as data:
+            return cls.loads(data, signature_resolver=signature_resolver)
+
     def __repr__(self):
         return "<CFG: {} Functions, {} Basic Blocks>".format(
             len(self.functions),
@@ -116,20 +255,51 @@ class CFG(object):
         self.clear()
         self._bytecode = bytecode
 
+    @property
+    def optimization_enabled(self):
+        return self._optimization_enabled
+
+    @property
+    def budget(self):
+        '''
+        Return the limits of the functions' analyses (AnalysisBudget, or None)
+        '''
+        return self._budget
+
+    @property
+    def incomplete(self):
+        '''
+        Return True if the analysis of a function stopped before its end (see AnalysisBudget)
+        '''
+        return any(function.incomplete for function in self._functions.values())
+
     @property
     def basic_blocks(self):
         '''
-        Return the list of basic_block
+        Return the list of basic blocks, in address order
         '''
-        bbs = self._basic_blocks.values()
-        return list(set(bbs))
+        return list(self._block_index.blocks)
+
+    @property
+    def stats(self):
+        '''
+        Return the timers of the analysis phases, and the counters of the functions' analyses (Stats)
+        '''
+        return self._stats
+
+    @property
+    def edge_index(self):
+        '''
+        Return the edges between the basic blocks (EdgeIndex)
+        '''
+        return self._edge_index
 
     @property
     def entry_point(self):
         '''
         Return the entry point of the cfg (the basic block at 0x0)
         '''
-        return self._basic_blocks[0]
+        return self._block_index[0]
 
     @property
     def functions(self):
@@ -143,7 +313,29 @@ class CFG(object):
         '''
         Return the list of instructions
         '''
-        return list(self._instructions.values())
+        return self._instruction_table.instructions()
+
+    @property
+    def instruction_table(self):
+        '''
+        Return the InstructionTable
+        '''
+        return self._instruction_table
+
+    @property
+    def jumpdests(self):
+        '''
+        Return the pcs of the JUMPDEST instructions (frozenset)
+        '''
+        return self._jumpdests
+
+    def is_jumpdest(self, addr):
+        '''Return True if there is a JUMPDEST at the provided address.
+
+        :param addr: Address of instruction
+        :type addr: int
+        '''
+        return 0 <= addr < len(self._jumpdests_map) and self._jumpdests_map[addr] == 1
 
     def get_instruction_at(self, addr):
         '''Return the instruction at the provided address.
@@ -151,7 +343,10 @@ class CFG(object):
         :param addr: Address of instruction
         :type addr: int
         '''
-        return self._instructions.get(addr)
+        idx = self._instruction_table.index_of(addr)
+        if idx is None:
+            return None
+        return self._instruction_table.instruction(idx)
 
     def get_basic_block_at(self, addr):
         '''Return the basic block at the provided address.
@@ -163,7 +358,16 @@ class CFG(object):
         :type addr: int
         :return: BasicBlock, None -- the requested basic block
         '''
-        return self._basic_blocks.get(addr)
+        return self._block_index.get(addr)
+
+    def get_basic_block_containing(self, addr):
+        '''Return the basic block containing the instruction at the provided address.
+
+        :param addr: Address of an instruction
+        :type addr: int
+        :return: BasicBlock, None -- the basic block
+        '''
+        return self._block_index.block_containing(addr)
 
     def get_function_at(self, addr):
         '''Return the function at the provided address.
@@ -180,51 +384,193 @@ class CFG(object):
         :return:
         '''
         self.compute_basic_blocks()
-        self.compute_functions(self._basic_blocks[0], True)
-        self.add_function(Function(Function.DISPATCHER_ID, 0, self._basic_blocks[0], self))
+        with self._stats.timer('compute_functions'):
+            self.compute_functions(self._block_index[0], True)
+            self.add_function(Function(Function.DISPATCHER_ID, 0, self._block_index[0], self))
 
+        with self._stats.timer('resolve_names'):
+            self._resolve_names()
+
+    def _resolve_names(self):
+        '''
+        Name the functions with the signature resolver
+        :return:
+        '''
         for function in self.functions:
-            if function.hash_id in known_hashes:
-                function.name = known_hashes[function.hash_id]
+            name = self._signature_resolver.lookup(function.hash_id)
+            if name is not None:
+                function.name = name
 
     def create_cfgs(self):
         '''
         Compute the CFGs
         :return:
         '''
+        self.analyze_functions()
+
+    def _get_function(self, selector):
+        '''
+        Return the function matching a selector
+        :param selector: Function, hash id (int) or name (str)
+        :return: Function
+        '''
+        if isinstance(selector, Function):
+            return selector
         for function in self.functions:
+            if isinstance(selector, str):
+                if function.name == selector:
+                    return function
+            elif function.hash_id == selector:
+                return function
+        raise ValueError('Unknown function {}'.format(selector))
+
+    def analyze_functions(self, selectors=None):
+        '''
+        Compute the CFGs of some functions. The functions already analyzed are skipped.
+        The CFG of the dispatcher depends on the basic blocks reached by the other
+        functions, so all the functions are analyzed before it
+        :param selectors: functions, hash ids (int) or names (str). All the functions if None
+        :type selectors: None, list
+        :return: list(Function) -- the selected functions
+        '''
+        if selectors is None:
+            selected = self.functions
+        else:
+            selected = [self._get_function(selector) for selector in selectors]
 
-            vsa = StackValueAnalysis(
-                self,
-                function.entry,
-                function.hash_id,
-                self._optimization_enabled
-            )
-            bbs = vsa.analyze()
+        if any(f.hash_id == Function.DISPATCHER_ID and not f.analyzed for f in selected):
+            to_analyze = self.functions
+        else:
+            to_analyze = selected
+
+        # Keep the functions order, with the dispatcher last
+        to_analyze = set(to_analyze)
+        functions = [f for f in self.functions
+                     if f in to_analyze and not f.analyzed and f.hash_id != Function.DISPATCHER_ID]
+        dispatchers = [f for f in self.functions
+                       if f in to_analyze and not f.analyzed and f.hash_id == Function.DISPATCHER_ID]
 
-            function.basic_blocks = [self._basic_blocks[bb] for bb in bbs]
+        if not functions and not dispatchers:
+            return selected
 
-            if function.hash_id != Function.DISPATCHER_ID:
-                function.check_payable()
+        with self._stats.timer('analyze_functions'):
+            if self._workers and self._workers > 1 and len(functions) > 1:
+                self._analyze_in_workers(functions)
+            else:
+                for function in functions:
+                    self._analyze_function(function)
+
+            for function in dispatchers:
+                self._analyze_function(function)
+
+        return selected
+
+    def _budget_left(self):
+        '''
+        :return: (float, int) -- seconds and steps left for the functions' analyses, None if not limited
+        '''
+        if self._budget is None:
+            return (None, None)
+        return self._budget.remaining(self._analysis_time, self._analysis_steps)
+
+    def _analyze_function(self, function):
+        deadline = None
+        max_steps = None
+        if self._budget is not None:
+            (deadline, max_steps) = self._budget.function_limits(*self._budget_left())
+        vsa = StackValueAnalysis(
+            self,
+            function.entry,
+            function.hash_id,
+            enable_optimization=self._optimization_enabled,
+            max_steps=max_steps,
+            deadline=deadline
+        )
+        start = time.perf_counter()
+        bbs = vsa.analyze()
+        elapsed = time.perf_counter() - start
+        self._analysis_time += elapsed
+        self._analysis_steps += vsa.bb_visits
+        self._stats.add_function(function, elapsed, vsa.counters)
+
+        self._set_function_basic_blocks(function, bbs, vsa.cut_off)
+
+    def _analyze_in_workers(self, functions):
+        '''
+        Compute the CFGs of the functions in worker processes
+        :param functions: list(Function), without the dispatcher
+        :return:
+        '''
+        (time_left, steps_left) = self._budget_left()
+        function_steps = None
+        if steps_left is not None:
+            # The remainder goes to the first functions, so that they are
+            # analyzed even if there are fewer steps than functions
+            (share, remainder) = divmod(steps_left, len(functions))
+            function_steps = [share + 1 if idx < remainder else share for idx in range(len(functions))]
+
+        start = time.perf_counter()
+        results = parallel.analyze_functions(self, functions, self._workers, time_left, function_steps)
+        self._analysis_time += time.perf_counter() - start
+
+        # Merge in the functions order, so that the result does not
+        # depend on the scheduling of the workers
+        for function, result in zip(functions, results):
+            key = function.key
+            for (addr, fathers) in result['incoming']:
+                bb = self._block_index[addr]
+                bb.set_incoming_basic_blocks(key, [self._block_index[father] for father in fathers])
+            for (addr, sons) in result['outgoing']:
+                bb = self._block_index[addr]
+                bb.set_outgoing_basic_blocks(key, [self._block_index[son] for son in sons])
+            for addr in result['reacheable']:
+                self._block_index[addr].reacheable.append(key)
+
+            self._analysis_steps += result['counters']['bb_visits']
+            self._stats.add_function(function, result['time'], result['counters'])
+            self._set_function_basic_blocks(function, result['basic_blocks'], result['cut_off'])
+
+    def _set_function_basic_blocks(self, function, bbs, cut_off=()):
+        '''
+        Set the basic blocks of a function once its CFG is computed, and
+        compute its attributes
+        :param function: Function
+        :param bbs: list of start pcs of the basic blocks
+        :param cut_off: list of start pcs of the basic blocks not analyzed, if the analysis stopped
+        :return:
+        '''
+        function.basic_blocks = [self._block_index[bb] for bb in bbs]
+        function.cut_off_blocks = [self._block_index[bb] for bb in cut_off]
+
+        if function.incomplete:
+            logger.warning('Analysis of %s stopped, %d basic blocks cut off', function.name, len(cut_off))
+
+        if function.hash_id != Function.DISPATCHER_ID:
+            function.check_payable()
+            # The basic blocks cut off could change the state
+            if not function.incomplete:
                 function.check_view()
                 function.check_pure()
 
     def clear(self):
         self._functions = dict()
-        self._basic_blocks = dict()
-        self._instructions = dict()
+        self._block_index = BlockIndex()
+        self._edge_index = EdgeIndex()
+        self._static_edges_computed = False
+        self._instruction_table = InstructionTable(bytes())
+        self._jumpdests_map = bytearray()
+        self._jumpdests = frozenset()
         self._bytecode = bytes()
+        self._analysis_time = 0.
+        self._analysis_steps = 0
 
     def remove_metadata(self):
         '''
             Init bytecode contains metadata that needs to be removed
             see http://solidity.readthedocs.io/en/v0.4.24/metadata.html#encoding-of-the-metadata-hash-in-the-bytecode
         '''
-        self.bytecode = re.sub(
-            bytes(r'\xa1\x65\x62\x7a\x7a\x72\x30\x58\x20[\x00-\xff]{32}\x00\x29'.encode('charmap')),
-            b'',
-            self.bytecode
-        )
+        with self._stats.timer('remove_metadata'):
+            self.bytecode = strip_metadata(self.bytecode)
 
     def compute_basic_blocks(self):
         '''
@@ -235,32 +581,39 @@ class CFG(object):
             None
         '''
         # Do nothing if basic_blocks already exist
-        if self._basic_blocks:
+        if self._block_index:
             return
 
-        bb = BasicBlock()
-
-        for instruction in disassemble_all(self.bytecode):
-            self._instructions[instruction.pc] = instruction
+        with self._stats.timer('compute_basic_blocks'):
+            table, blocks, jumpdests = disassemble(self.bytecode)
+            self._set_basic_blocks(table, blocks, jumpdests)
 
-            if instruction.name == 'JUMPDEST':
-                # JUMPDEST indicates a new BasicBlock. Set the end pc
-                # of the current block, and switch to a new one.
-                if bb._instructions:
-                    self._basic_blocks[bb.end.pc] = bb
-
-                bb = BasicBlock()
-
-                self._basic_blocks[instruction.pc] = bb
+    def _set_basic_blocks(self, table, blocks, jumpdests=None):
+        '''
+            Create the BasicBlocks
+        Args:
+            table (InstructionTable)
+            blocks (list((int, int))): first and last instruction indexes of each basic block
+            jumpdests (list(int)): pcs of the JUMPDESTs. Computed from the table if None
+        Returns:
+            None
+        '''
+        self._instruction_table = table
 
-            bb.add_instruction(instruction)
+        if jumpdests is None:
+            jumpdests = [table.pc(idx) for idx in range(len(table)) if table.name(idx) == 'JUMPDEST']
 
-            if bb.start.pc == instruction.pc:
-                self._basic_blocks[instruction.pc] = bb
+        self._jumpdests_map = bytearray(len(self.bytecode))
+        for pc in jumpdests:
+            self._jumpdests_map[pc] = 1
+        self._jumpdests = frozenset(jumpdests)
 
-            if bb.end.name in BASIC_BLOCK_END:
-                self._basic_blocks[bb.end.pc] = bb
-                bb = BasicBlock()
+        basic_blocks = [BasicBlock(table, first, last, self._edge_index) for (first, last) in blocks]
+        # The last basic block is only registered by its end
+        # if it ends with a BASIC_BLOCK_END instruction
+        registered_ends = [bb for bb in basic_blocks
+                           if bb._last != len(table) - 1 or bb.end_name in BASIC_BLOCK_END]
+        self._block_index = BlockIndex(basic_blocks, registered_ends)
 
     def compute_functions(self, block, is_entry_block=False):
         """
@@ -282,7 +635,7 @@ class CFG(object):
                     push = block.instructions[-2]
                     assert push.name.startswith('PUSH')
                     destination = push.operand
-                    true_branch = self._basic_blocks[destination]
+                    true_branch = self._block_index[destination]
                     self.compute_functions(true_branch)
                     return
 
@@ -292,84 +645,99 @@ class CFG(object):
             # As a result, if GT is in the basic block, we are branching to
             # a branch of the dispatcher tree rather than directy calling the funciton
             if 'GT' in [i.name for i in block.instructions]:
-                next_branch = self._basic_blocks[function_start]
+                next_branch = self._block_index[function_start]
                 self.compute_functions(next_branch)
 
             else:
                 new_function = Function(
                     function_hash,
                     function_start,
-                    self._basic_blocks[function_start],
+                    self._block_index[function_start],
                     self
                 )
 
                 self._functions[function_start] = new_function
 
             if block.ends_with_jumpi():
-                false_branch = self._basic_blocks[block.end.pc + 1]
+                false_branch = self._block_index[block.end_pc + 1]
                 self.compute_functions(false_branch)
 
     def add_function(self, func):
         assert isinstance(func, Function)
         self._functions[func._start_addr] = func
 
-    def compute_simple_edges(self, key):
-        for bb in self._basic_blocks.values():
+    def compute_static_edges(self):
+        '''
+        Compute the edges that do not depend on the stack, once per CFG
+        '''
+        if self._static_edges_computed:
+            return
+
+        edges = []
+        for bb in self._block_index.blocks:
 
-            if bb.end.name == 'JUMPI':
-                dst = self._basic_blocks[bb.end.pc + 1]
-                bb.add_outgoing_basic_block(dst, key)
-                dst.add_incoming_basic_block(bb, key)
+            if bb.end_name == 'JUMPI':
+                dst = self._block_index[bb.end_pc + 1]
+                edges.append((bb, dst))
 
             # A bb can be split in the middle if it has a JUMPDEST
             # Because another edge can target the JUMPDEST
-            if bb.end.name not in BASIC_BLOCK_END:
+            if bb.end_name not in BASIC_BLOCK_END:
+                end = bb.end
                 try:
-                    dst = self._basic_blocks[bb.end.pc + 1 + bb.end.operand_size]
+                    dst = self._block_index[end.pc + 1 + end.operand_size]
                 except KeyError:
                     continue
                 assert dst.start.name == 'JUMPDEST'
-                bb.add_outgoing_basic_block(dst, key)
-                dst.add_incoming_basic_block(bb, key)
+                edges.append((bb, dst))
+
+        self._edge_index.set_static_edges(edges)
+        self._static_edges_computed = True
+
+    def compute_simple_edges(self, key):
+        '''
+        Add the static edges to a function. They are added on demand, to the
+        basic blocks accessed, until compute_reachability
+        '''
+        self.compute_static_edges()
+        self._edge_index.add_static_overlay(key)
 
     def compute_reachability(self, entry_point, key):
         bbs_saw = [entry_point]
+        ids_saw = {entry_point.id}
 
         bbs_to_explore = [entry_point]
         while bbs_to_explore:
             bb = bbs_to_explore.pop()
             for son in bb.outgoing_basic_blocks(key):
-                if not son in bbs_saw:
+                if son.id not in ids_saw:
+                    ids_saw.add(son.id)
                     bbs_saw.append(son)
                     bbs_to_explore.append(son)
 
         for bb in bbs_saw:
             bb.reacheable.append(key)
 
-        # clean son/fathers that are created by compute_simple_edges
-        # but are not reacheable
-        for bb in self._basic_blocks.values():
-            if not bb in bbs_saw:
-                if key in bb._incoming_basic_blocks:
-                    bb._incoming_basic_blocks.pop(key)
-                if key in bb._outgoing_basic_blocks:
-                    bb._outgoing_basic_blocks.pop(key)
+        # Add the static edges of the reached blocks, and clean son/fathers
+        # that are not reacheable
+        self._edge_index.close_static_overlay(key, ids_saw)
 
     def output_to_dot(self, base_filename):
 
-        with open('{}{}.dot'.format(base_filename, 'FULL_GRAPH'), 'w') as f:
-            f.write('digraph{\n')
-            for basic_block in self.basic_blocks:
-                instructions = ['{}:{}'.format(hex(ins.pc),
-                                               str(ins)) for ins in basic_block.instructions]
-                instructions = '\n'.join(instructions)
+        with self._stats.timer('output_to_dot'):
+            with open('{}{}.dot'.format(base_filename, 'FULL_GRAPH'), 'w') as f:
+                f.write('digraph{\n')
+                for basic_block in self.basic_blocks:
+                    instructions = ['{}:{}'.format(hex(ins.pc),
+                                                   str(ins)) for ins in basic_block.instructions]
+                    instructions = '\n'.join(instructions)
 
-                f.write('{}[label="{}"]\n'.format(basic_block.start.pc, instructions))
+                    f.write('{}[label="{}"]\n'.format(basic_block.start_pc, instructions))
 
-                for son in basic_block.all_outgoing_basic_blocks:
-                    f.write('{} -> {}\n'.format(basic_block.start.pc, son.start.pc))
+                    for son in basic_block.all_outgoing_basic_blocks:
+                        f.write('{} -> {}\n'.format(basic_block.start_pc, son.start_pc))
 
-            f.write('\n}')
+                f.write('\n}')
 
 def is_jump_to_function(block):
     '''
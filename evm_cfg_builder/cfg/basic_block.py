@@ -1,88 +1,178 @@
+from .edge_index import BlockEdges
+
+
 class BasicBlock(object):
 
-    def __init__(self):
-        self._instructions = []
-        # incoming_basic_blocks and outgoing_basic_blocks are dict
-        # The key is the function hash
-        # It allows to compute the VSA only
+    def __init__(self, instruction_table=None, first=0, last=-1, edge_index=None):
+        '''
+        The instructions of a basic block of a CFG are a range of its instruction
+        table. Without a table, the instructions are added with add_instruction,
+        as before the instruction table.
+
+        Args:
+            instruction_table (InstructionTable)
+            first (int): index of the first instruction in the table
+            last (int): index of the last instruction in the table
+            edge_index (EdgeIndex): edges of the CFG. Without it, the block keeps its own
+            edges (see BlockEdges), and its id is None
+        '''
+        self._instruction_table = instruction_table
+        self._first = first
+        self._last = last
+        # pyevmasm.Instruction objects, created on the first access if there is a table
+        self._instructions = None if instruction_table is not None else []
+        # The incoming and outgoing basic blocks are stored in the edge index
+        # by function hash. It allows to compute the VSA only
         # On a specific function, to separate
         # the merging
-        self._incoming_basic_blocks = {}
-        self._outgoing_basic_blocks = {}
+        if edge_index is None:
+            self._edge_index = BlockEdges()
+            self._id = None
+        else:
+            self._edge_index = edge_index
+            self._id = edge_index.add_block(self)
 
         # List of function keys that reaches the BB
         self.reacheable = []
 
+    def __repr__(self):
+        return '<cfg BasicBlock@{:x}-{:x}>'.format(self.start_pc, self.end_pc)
+
     def add_instruction(self, instruction):
+        '''
+        Add an instruction to a basic block without instruction table
+        Args:
+            instruction (pyevmasm.Instruction)
+        '''
+        assert self._instruction_table is None, 'The instructions come from the instruction table'
         self._instructions.append(instruction)
 
-    def __repr__(self):
-        return '<cfg BasicBlock@{:x}-{:x}>'.format(self.start.pc, self.end.pc)
+    def _get_instructions(self):
+        if self._instructions is None:
+            self._instructions = self._instruction_table.instructions(self._first, self._last)
+        return self._instructions
 
     @property
     def start(self):
         '''First instruction of the basic block.'''
-        return self._instructions[0]
+        return self._get_instructions()[0]
 
     @property
     def end(self):
         '''Last instruction of the basic block.'''
-        return self._instructions[-1]
+        return self._get_instructions()[-1]
+
+    @property
+    def start_pc(self):
+        '''pc of the first instruction of the basic block.'''
+        if self._instruction_table is None:
+            return self._instructions[0].pc
+        return self._instruction_table.pc(self._first)
+
+    @property
+    def end_pc(self):
+        '''pc of the last instruction of the basic block.'''
+        if self._instruction_table is None:
+            return self._instructions[-1].pc
+        return self._instruction_table.pc(self._last)
+
+    @property
+    def end_name(self):
+        '''Name of the last instruction of the basic block.'''
+        if self._instruction_table is None:
+            return self._instructions[-1].name
+        return self._instruction_table.name(self._last)
 
     @property
     def instructions(self):
-        return list(self._instructions)
+        return list(self._get_instructions())
+
+    @property
+    def instruction_table(self):
+        return self._instruction_table
+
+    @property
+    def instruction_indexes(self):
+        '''Indexes of the instructions in the instruction table.'''
+        return range(self._first, self._last + 1)
+
+    @property
+    def id(self):
+        '''Id of the basic block: its rank in the address order of the CFG (None outside of a CFG).'''
+        return self._id
 
     def incoming_basic_blocks(self, key):
-        return self._incoming_basic_blocks.get(key, [])
+        return self._edge_index.incoming_of(self._id, key)
 
     def outgoing_basic_blocks(self, key):
-        return self._outgoing_basic_blocks.get(key, [])
+        return self._edge_index.outgoing_of(self._id, key)
 
     @property
     def incoming_basic_blocks_as_dict(self):
-        return self._incoming_basic_blocks
+        return self._edge_index.incoming_by_key(self._id)
 
     @property
     def outgoing_basic_blocks_as_dict(self):
-        return self._outgoing_basic_blocks
+        return self._edge_index.outgoing_by_key(self._id)
 
     @property
     def all_incoming_basic_blocks(self):
-        bbs = self._incoming_basic_blocks.values()
-        bbs = [bb for sublist in bbs for bb in sublist]
-        return list(set(bbs))
+        '''
+        Incoming basic blocks of all the functions
+        '''
+        return self._edge_index.neighbours(self._id, incoming=True)
 
     @property
     def all_outgoing_basic_blocks(self):
-        bbs = self._outgoing_basic_blocks.values()
-        bbs = [bb for sublist in bbs for bb in sublist]
-        return list(set(bbs))
+        '''
+        Outgoing basic blocks of all the functions
+        '''
+        return self._edge_index.neighbours(self._id)
 
     def add_incoming_basic_block(self, father, key):
-        if not key in self._incoming_basic_blocks:
-            self._incoming_basic_blocks[key] = []
-        if father not in self._incoming_basic_blocks[key]:
-            self._incoming_basic_blocks[key].append(father)
+        self._edge_index.add_incoming(self, father, key)
 
     def add_outgoing_basic_block(self, son, key):
-        if not key in self._outgoing_basic_blocks:
-            self._outgoing_basic_blocks[key] = []
-        if son not in self._outgoing_basic_blocks[key]:
-            self._outgoing_basic_blocks[key].append(son)
+        self._edge_index.add_outgoing(self, son, key)
+
+    def set_incoming_basic_blocks(self, key, fathers):
+        '''
+        Replace the incoming basic blocks of a function
+        Args:
+            key (int): function key
+            fathers (list(BasicBlock))
+        '''
+        self._edge_index.set_incoming(self, key, fathers)
+
+    def set_outgoing_basic_blocks(self, key, sons):
+        '''
+        Replace the outgoing basic blocks of a function
+        Args:
+            key (int): function key
+            sons (list(BasicBlock))
+        '''
+        self._edge_index.set_outgoing(self, key, sons)
+
+    def remove_basic_blocks(self, key):
+        '''
+        Remove the incoming and outgoing basic blocks of a function
+        Args:
+            key (int): function key
+        '''
+        self._edge_index.remove(self, key)
 
     def ends_with_jumpi(self):
-        return self.end.name == 'JUMPI'
+        return self.end_name == 'JUMPI'
 
     def ends_with_jump_or_jumpi(self):
-        return self.end.name in ('JUMP', 'JUMPI')
+        return self.end_name in ('JUMP', 'JUMPI')
 
     def true_branch(self, key):
         assert(self.ends_with_jumpi())
 
         outgoing_basic_blocks = [
             bb for bb in self.outgoing_basic_blocks(key)
-            if bb.start.pc != self.end.pc + 1
+            if bb.start_pc != self.end_pc + 1
         ]
 
         if len(outgoing_basic_blocks[key]) > 1:
@@ -95,10 +185,11 @@ class BasicBlock(object):
 
         outgoing_basic_blocks = [
             bb for bb in self.outgoing_basic_blocks(key)
-            if bb.start.pc == self.end.pc + 1
+            if bb.start_pc == self.end_pc + 1
         ]
         if len(outgoing_basic_blocks) > 1:
             return
 
         return next(outgoing_basic_blocks[key], None)
 
+
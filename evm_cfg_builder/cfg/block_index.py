@@ -0,0 +1,79 @@
+from array import array
+from bisect import bisect_right
+
+
+class BlockIndex(object):
+    '''Basic blocks of a CFG, in address order.
+
+    The id of a basic block is its rank in the address order. A basic block
+    can be looked up by its start pc, by its end pc (like the jump
+    instructions are), or by the pc of any of its instructions
+    (block_containing).
+    '''
+
+    def __init__(self, basic_blocks=(), registered_ends=()):
+        '''
+        Args:
+            basic_blocks (list(BasicBlock)): in address order
+            registered_ends (list(BasicBlock)): basic blocks that can be looked up by their end pc
+        '''
+        self._blocks = tuple(basic_blocks)
+        self._starts = array('I', [bb.start_pc for bb in self._blocks])
+        self._by_start = {bb.start_pc: bb for bb in self._blocks}
+        self._by_end = {bb.end_pc: bb for bb in registered_ends}
+        for (block_id, bb) in enumerate(self._blocks):
+            assert bb.id == block_id
+
+    @property
+    def blocks(self):
+        '''
+        Returns
+            tuple(BasicBlock): in address order
+        '''
+        return self._blocks
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def block(self, block_id):
+        return self._blocks[block_id]
+
+    def get(self, pc, default=None):
+        '''
+        Return the basic block starting or ending at pc
+        '''
+        bb = self._by_start.get(pc)
+        if bb is None:
+            return self._by_end.get(pc, default)
+        return bb
+
+    def __getitem__(self, pc):
+        bb = self.get(pc)
+        if bb is None:
+            raise KeyError(pc)
+        return bb
+
+    def __contains__(self, pc):
+        return pc in self._by_start or pc in self._by_end
+
+    def starting_at(self, pc):
+        return self._by_start.get(pc)
+
+    def ending_at(self, pc):
+        return self._by_end.get(pc)
+
+    def block_containing(self, pc):
+        '''
+        Return the basic block containing the instruction at pc
+        Args:
+            pc (int)
+        Returns:
+            BasicBlock or None
+        '''
+        idx = bisect_right(self._starts, pc) - 1
+        if idx < 0:
+            return None
+        bb = self._blocks[idx]
+        if pc > bb.end_pc:
+            return None
+        return bb
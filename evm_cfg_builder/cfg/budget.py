@@ -0,0 +1,67 @@
+import time
+
+
+class AnalysisBudget(object):
+    '''Limits of the value analysis, for the whole contract and for each function.
+
+    The times are wall-clock seconds, and the steps are basic block analyses
+    (see StackValueAnalysis.bb_visits). None means no limit.
+
+    The contract limits cover all the functions' analyses, including the
+    ones computed later with the lazy analysis. Once a limit is reached, the
+    analysis of the function stops: its CFG is partial, and the basic blocks
+    whose analysis was pending are reported (see Function.cut_off_blocks).
+    The functions analyzed after the contract budget is spent are not explored.
+
+    With worker processes, the contract steps left are split evenly between
+    the functions analyzed in parallel.
+    '''
+
+    def __init__(self, max_time=None, max_steps=None, function_max_time=None, function_max_steps=None):
+        '''
+        Args:
+            max_time (float): seconds spent on all the functions
+            max_steps (int): basic block analyses of all the functions
+            function_max_time (float): seconds spent on one function
+            function_max_steps (int): basic block analyses of one function
+        '''
+        self.max_time = max_time
+        self.max_steps = max_steps
+        self.function_max_time = function_max_time
+        self.function_max_steps = function_max_steps
+
+    def __repr__(self):
+        return '<AnalysisBudget max_time={} max_steps={} function_max_time={} function_max_steps={}>'.format(
+            self.max_time, self.max_steps, self.function_max_time, self.function_max_steps)
+
+    def remaining(self, elapsed, steps):
+        '''
+        Return the contract budget left
+        Args:
+            elapsed (float): seconds already spent
+            steps (int): steps already spent
+        Returns:
+            (float, int): seconds and steps left (None if not limited)
+        '''
+        time_left = None
+        if self.max_time is not None:
+            time_left = max(self.max_time - elapsed, 0.)
+        steps_left = None
+        if self.max_steps is not None:
+            steps_left = max(self.max_steps - steps, 0)
+        return (time_left, steps_left)
+
+    def function_limits(self, time_left, steps_left):
+        '''
+        Return the limits of the analysis of a function starting now
+        Args:
+            time_left (float): seconds left for the contract (None if not limited)
+            steps_left (int): steps left for the contract (None if not limited)
+        Returns:
+            (float, int): deadline (time.monotonic() value) and maximum number of steps, None if not limited
+        '''
+        timeouts = [t for t in (time_left, self.function_max_time) if t is not None]
+        deadline = time.monotonic() + min(timeouts) if timeouts else None
+        steps = [s for s in (steps_left, self.function_max_steps) if s is not None]
+        max_steps = min(steps) if steps else None
+        return (deadline, max_steps)
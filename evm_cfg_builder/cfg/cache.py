@@ -0,0 +1,188 @@
+'''
+    Content-addressed on-disk cache of analysis results
+
+    The entries are keyed by the sha256 of the normalized bytecode (see
+    CFG.from_cache) and of the analysis options. Each entry is a file written
+    atomically (temporary file + rename), so several processes can share the
+    same cache directory.
+'''
+import hashlib
+import os
+import tempfile
+
+# Bump when the content of the entries changes
+CACHE_FORMAT_VERSION = 4
+
+_SUFFIX = '.cfg'
+
+# The size of the cache is tracked by each process, and read again from the
+# disk every _RESCAN_PUTS puts, to account for the entries written by the others
+_RESCAN_PUTS = 256
+# An eviction frees the cache down to this ratio of max_size
+_EVICTION_RATIO = 0.9
+
+
+class CFGCache(object):
+    '''On-disk cache of CFG analysis results.
+
+    If max_size (in bytes) is set, the least recently used entries are removed
+    once the cache grows above it. The size is tracked on each put, and the
+    directory is only scanned on an eviction, or every _RESCAN_PUTS puts.
+    An eviction goes below max_size, so that it does not run on every put.
+    '''
+
+    def __init__(self, directory, max_size=None):
+        self._directory = directory
+        self._max_size = max_size
+        # Estimated size of the cache, None until the first scan
+        self._size = None
+        self._puts_since_scan = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return '<CFGCache {}>'.format(self._directory)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @staticmethod
+    def key(bytecode, **options):
+        '''
+            Return the key of a bytecode analyzed with the given options
+        Args:
+            bytecode (bytes): normalized bytecode
+            options: analysis options
+        Returns:
+            str
+        '''
+        h = hashlib.sha256()
+        h.update(bytecode)
+        h.update(repr((CACHE_FORMAT_VERSION, sorted(options.items()))).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key[:2], key + _SUFFIX)
+
+    def get(self, key):
+        '''
+            Return the entry, or None if it is not in the cache
+        Args:
+            key (str)
+        Returns:
+            bytes
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = f.read()
+        except FileNotFoundError:
+            return None
+
+        # Update the modification time, used as last access time for the eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        '''
+            Add an entry
+        Args:
+            key (str)
+            entry (bytes)
+        '''
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        previous_size = 0
+        if self._max_size is not None:
+            try:
+                previous_size = os.path.getsize(path)
+            except OSError:
+                pass
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(entry)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        if self._max_size is not None:
+            self._puts_since_scan += 1
+            if self._size is None or self._puts_since_scan >= _RESCAN_PUTS:
+                self._size = self.size()
+                self._puts_since_scan = 0
+            else:
+                self._size += len(entry) - previous_size
+            if self._size > self._max_size:
+                self.evict(int(self._max_size * _EVICTION_RATIO))
+
+    def remove(self, key):
+        '''
+            Remove an entry (ex: an invalid entry)
+        Args:
+            key (str)
+        '''
+        path = self._path(key)
+        if self._size is not None:
+            try:
+                self._size -= os.path.getsize(path)
+            except OSError:
+                pass
+        self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        # Another process can remove the file at the same time
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self._directory):
+            for filename in files:
+                if not filename.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        '''
+            Return the size of the cache, in bytes
+        '''
+        return sum(size for (_, size, _) in self._entries())
+
+    def evict(self, max_size):
+        '''
+            Remove the least recently used entries until the cache is below max_size bytes
+        Args:
+            max_size (int)
+        '''
+        entries = self._entries()
+        total = sum(size for (_, size, _) in entries)
+        if total > max_size:
+            for (_, size, path) in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= max_size:
+                    break
+        self._size = total
+        self._puts_since_scan = 0
+
+    def clear(self):
+        for (_, _, path) in self._entries():
+            self._remove(path)
+        self._size = 0
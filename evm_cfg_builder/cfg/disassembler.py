@@ -0,0 +1,84 @@
+from array import array
+
+from .instruction_table import InstructionTable, OPCODE_NAMES, OPERAND_SIZES
+
+BASIC_BLOCK_END = [
+    'STOP',
+    'SELFDESTRUCT',
+    'RETURN',
+    'REVERT',
+    'INVALID',
+    'SUICIDE',
+    'JUMP',
+    'JUMPI'
+]
+
+JUMPDEST = 0x5b
+
+# Per opcode flags, indexed by the opcode byte
+BLOCK_END_FLAG = 1
+JUMPDEST_FLAG = 2
+
+OPCODE_FLAGS = bytes(
+    (BLOCK_END_FLAG if OPCODE_NAMES[opcode] in BASIC_BLOCK_END else 0) |
+    (JUMPDEST_FLAG if opcode == JUMPDEST else 0)
+    for opcode in range(256)
+)
+
+
+def disassemble(bytecode):
+    '''
+        Linear sweep of the bytecode
+
+        A basic block starts at a JUMPDEST, or after an instruction of
+        BASIC_BLOCK_END. Like pyevmasm, the decoding stops on a truncated
+        PUSH at the end of the bytecode.
+    Args:
+        bytecode (bytes)
+    Returns:
+        (InstructionTable, list((int, int)), list(int)): the instructions, the
+        basic blocks as (first, last) indexes in the table, and the pcs of the
+        JUMPDESTs
+    '''
+    pcs = array('I')
+    opcodes = bytearray()
+    blocks = []
+    jumpdests = []
+
+    size = len(bytecode)
+    operand_sizes = OPERAND_SIZES
+    opcode_flags = OPCODE_FLAGS
+
+    pc = 0
+    idx = 0
+    first = None
+    while pc < size:
+        opcode = bytecode[pc]
+        next_pc = pc + 1 + operand_sizes[opcode]
+        if next_pc > size:
+            break
+
+        pcs.append(pc)
+        opcodes.append(opcode)
+
+        flags = opcode_flags[opcode]
+        if flags & JUMPDEST_FLAG:
+            jumpdests.append(pc)
+            if first is not None:
+                blocks.append((first, idx - 1))
+            first = idx
+        elif first is None:
+            first = idx
+
+        if flags & BLOCK_END_FLAG:
+            blocks.append((first, idx))
+            first = None
+
+        pc = next_pc
+        idx += 1
+
+    if first is not None:
+        blocks.append((first, idx - 1))
+
+    table = InstructionTable(bytecode, pcs, opcodes)
+    return table, blocks, jumpdests
@@ -0,0 +1,381 @@
+from array import array
+
+
+class EdgeIndex(object):
+    '''Edges between the basic blocks of a CFG, for all the functions.
+
+    The basic blocks are numbered in the order they are added. An edge is a
+    (src block id, dst block id, function key) triple; the triples are kept
+    in insertion order, and the incoming and outgoing lists of each block
+    are indexed by function key, then by block id.
+
+    Whole-graph queries can use the CSR (compressed sparse row) adjacency
+    arrays of a function, or of the union of all the functions. They are
+    built on demand, and reset when an edge of the function changes.
+
+    The static edges (the fall-throughs, which do not depend on the stack)
+    are computed once per CFG. While a function is analyzed, they are an
+    overlay on its edges: the static edges of a block are added to the
+    function the first time the block is accessed or gets a new edge, so
+    that the cost is proportional to the blocks the function reaches.
+    '''
+
+    def __init__(self):
+        self._blocks = []
+        # (src id, dst id, key) -> None, for the outgoing and the incoming lists
+        self._outgoing_edges = {}
+        self._incoming_edges = {}
+        # key -> block id -> list(BasicBlock)
+        self._outgoing = {}
+        self._incoming = {}
+        # (key, incoming) -> (offsets, targets), key is None for the union
+        self._csr = {}
+        # block id -> list(BasicBlock), for the static edges
+        self._static_outgoing = {}
+        self._static_incoming = {}
+        # Keys of the functions whose static edges are added on demand
+        self._overlays = set()
+
+    def add_block(self, bb):
+        '''
+        Register a basic block
+        Args:
+            bb (BasicBlock)
+        Returns:
+            int: id of the basic block
+        '''
+        self._blocks.append(bb)
+        return len(self._blocks) - 1
+
+    def block(self, block_id):
+        return self._blocks[block_id]
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def edges(self, key=None):
+        '''
+        Args:
+            key (int): function key, or None for all the functions
+        Returns:
+            list((int, int, int)): (src id, dst id, key) of the outgoing edges
+        '''
+        if key is None:
+            return list(self._outgoing_edges)
+        return [edge for edge in self._outgoing_edges if edge[2] == key]
+
+    def outgoing(self, key):
+        '''
+        Returns
+            dict(int -> list(BasicBlock)): outgoing basic blocks of a function, by block id
+        '''
+        return self._outgoing.get(key, {})
+
+    def incoming(self, key):
+        '''
+        Returns
+            dict(int -> list(BasicBlock)): incoming basic blocks of a function, by block id
+        '''
+        return self._incoming.get(key, {})
+
+    def outgoing_of(self, bb_id, key):
+        '''
+        Returns
+            list(BasicBlock): outgoing basic blocks of a block for a function
+        '''
+        bbs_per_id = self._outgoing.get(key)
+        if bbs_per_id is not None:
+            bbs = bbs_per_id.get(bb_id)
+            if bbs is not None:
+                return bbs
+        if key in self._overlays and bb_id in self._static_outgoing:
+            return self._apply_static_outgoing(bb_id, key)
+        return []
+
+    def incoming_of(self, bb_id, key):
+        '''
+        Returns
+            list(BasicBlock): incoming basic blocks of a block for a function
+        '''
+        bbs_per_id = self._incoming.get(key)
+        if bbs_per_id is not None:
+            bbs = bbs_per_id.get(bb_id)
+            if bbs is not None:
+                return bbs
+        if key in self._overlays and bb_id in self._static_incoming:
+            return self._apply_static_incoming(bb_id, key)
+        return []
+
+    def outgoing_by_key(self, bb_id):
+        '''
+        Returns
+            dict(int -> list(BasicBlock)): outgoing basic blocks of a block, by function key
+        '''
+        return {key: bbs[bb_id] for (key, bbs) in self._outgoing.items() if bb_id in bbs}
+
+    def incoming_by_key(self, bb_id):
+        '''
+        Returns
+            dict(int -> list(BasicBlock)): incoming basic blocks of a block, by function key
+        '''
+        return {key: bbs[bb_id] for (key, bbs) in self._incoming.items() if bb_id in bbs}
+
+    def set_static_edges(self, edges):
+        '''
+        Set the static edges of the CFG
+        Args:
+            edges (list((BasicBlock, BasicBlock))): (src, dst), in the order they are added to the functions
+        '''
+        self._static_outgoing = {}
+        self._static_incoming = {}
+        for (src, dst) in edges:
+            self._static_outgoing.setdefault(src._id, []).append(dst)
+            self._static_incoming.setdefault(dst._id, []).append(src)
+
+    def add_static_overlay(self, key):
+        '''
+        Add the static edges to a function, on demand, until close_static_overlay
+        Args:
+            key (int): function key
+        '''
+        self._overlays.add(key)
+
+    def close_static_overlay(self, key, block_ids):
+        '''
+        Add the static edges of the blocks reached by a function, and remove
+        the edges of the other blocks (see retain)
+        Args:
+            key (int): function key
+            block_ids (set(int)): ids of the blocks reached by the function
+        '''
+        if key in self._overlays:
+            for bb_id in sorted(block_ids):
+                self.outgoing_of(bb_id, key)
+                self.incoming_of(bb_id, key)
+            self._overlays.discard(key)
+        self.retain(key, block_ids)
+
+    def _apply_static_outgoing(self, bb_id, key):
+        self._outgoing.setdefault(key, {})[bb_id] = []
+        src = self._blocks[bb_id]
+        for dst in self._static_outgoing[bb_id]:
+            self.add_outgoing(src, dst, key)
+        return self._outgoing[key][bb_id]
+
+    def _apply_static_incoming(self, bb_id, key):
+        self._incoming.setdefault(key, {})[bb_id] = []
+        dst = self._blocks[bb_id]
+        for src in self._static_incoming[bb_id]:
+            self.add_incoming(dst, src, key)
+        return self._incoming[key][bb_id]
+
+    def add_outgoing(self, src, dst, key):
+        '''
+        Add dst to the outgoing basic blocks of src, if not already there
+        Args:
+            src (BasicBlock)
+            dst (BasicBlock)
+            key (int): function key
+        '''
+        edge = (src._id, dst._id, key)
+        if edge not in self._outgoing_edges:
+            if key in self._overlays:
+                # The static edges come first
+                self.outgoing_of(src._id, key)
+                if edge in self._outgoing_edges:
+                    return
+            self._outgoing_edges[edge] = None
+            self._outgoing.setdefault(key, {}).setdefault(src._id, []).append(dst)
+            self._reset(key)
+
+    def add_incoming(self, dst, src, key):
+        '''
+        Add src to the incoming basic blocks of dst, if not already there
+        Args:
+            dst (BasicBlock)
+            src (BasicBlock)
+            key (int): function key
+        '''
+        edge = (src._id, dst._id, key)
+        if edge not in self._incoming_edges:
+            if key in self._overlays:
+                # The static edges come first
+                self.incoming_of(dst._id, key)
+                if edge in self._incoming_edges:
+                    return
+            self._incoming_edges[edge] = None
+            self._incoming.setdefault(key, {}).setdefault(dst._id, []).append(src)
+            self._reset(key)
+
+    def add_edge(self, src, dst, key):
+        self.add_outgoing(src, dst, key)
+        self.add_incoming(dst, src, key)
+
+    def set_outgoing(self, bb, key, sons):
+        '''
+        Replace the outgoing basic blocks of bb for a function
+        '''
+        self._remove(self._outgoing, self._outgoing_edges, bb._id, key, False)
+        self._outgoing.setdefault(key, {})[bb._id] = []
+        for son in sons:
+            self.add_outgoing(bb, son, key)
+
+    def set_incoming(self, bb, key, fathers):
+        '''
+        Replace the incoming basic blocks of bb for a function
+        '''
+        self._remove(self._incoming, self._incoming_edges, bb._id, key, True)
+        self._incoming.setdefault(key, {})[bb._id] = []
+        for father in fathers:
+            self.add_incoming(bb, father, key)
+
+    def remove(self, bb, key):
+        '''
+        Remove the incoming and outgoing basic blocks of bb for a function
+        The lists of the other basic blocks are not modified
+        '''
+        bb_id = bb._id
+        if bb_id in self._outgoing.get(key, ()):
+            self._remove(self._outgoing, self._outgoing_edges, bb_id, key, False)
+        if bb_id in self._incoming.get(key, ()):
+            self._remove(self._incoming, self._incoming_edges, bb_id, key, True)
+
+    def retain(self, key, block_ids):
+        '''
+        Remove the incoming and outgoing basic blocks of a function, for the
+        blocks that are not in block_ids. Only the blocks with edges are walked
+        Args:
+            key (int): function key
+            block_ids (set(int))
+        '''
+        for (lists, edges, incoming) in [(self._outgoing, self._outgoing_edges, False),
+                                         (self._incoming, self._incoming_edges, True)]:
+            to_remove = [bb_id for bb_id in lists.get(key, ()) if bb_id not in block_ids]
+            for bb_id in to_remove:
+                self._remove(lists, edges, bb_id, key, incoming)
+
+    def _remove(self, lists, edges, bb_id, key, incoming):
+        bbs_per_id = lists.get(key)
+        if bbs_per_id is None or bb_id not in bbs_per_id:
+            return
+        for other in bbs_per_id.pop(bb_id):
+            if incoming:
+                del edges[(other._id, bb_id, key)]
+            else:
+                del edges[(bb_id, other._id, key)]
+        if not bbs_per_id:
+            del lists[key]
+        self._reset(key)
+
+    def _reset(self, key):
+        if self._csr:
+            for cached in [(key, False), (key, True), (None, False), (None, True)]:
+                self._csr.pop(cached, None)
+
+    def csr(self, key=None, incoming=False):
+        '''
+        CSR adjacency of a function
+        The neighbours of the block i are the ids targets[offsets[i]:offsets[i + 1]]
+        Args:
+            key (int): function key, or None for the union of all the functions
+            incoming (bool): if True, the neighbours are the incoming basic blocks
+        Returns:
+            (array, array): offsets and targets
+        '''
+        csr = self._csr.get((key, incoming))
+        if csr is None:
+            csr = self._build_csr(key, incoming)
+            self._csr[(key, incoming)] = csr
+        return csr
+
+    def _build_csr(self, key, incoming):
+        rows = [[] for _ in range(len(self._blocks))]
+        if key is None:
+            # The union of the functions, without duplicate
+            seen = set()
+            for (src, dst, _) in (self._incoming_edges if incoming else self._outgoing_edges):
+                (row, col) = (dst, src) if incoming else (src, dst)
+                if (row, col) not in seen:
+                    seen.add((row, col))
+                    rows[row].append(col)
+        else:
+            lists = self._incoming if incoming else self._outgoing
+            for (block_id, bbs) in lists.get(key, {}).items():
+                rows[block_id] = [bb._id for bb in bbs]
+
+        offsets = array('I', [0])
+        targets = array('I')
+        for row in rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        return (offsets, targets)
+
+    def neighbours(self, block_id, key=None, incoming=False):
+        '''
+        Returns
+            list(BasicBlock): the neighbours of a basic block, from the CSR adjacency
+        '''
+        (offsets, targets) = self.csr(key, incoming)
+        blocks = self._blocks
+        return [blocks[i] for i in targets[offsets[block_id]:offsets[block_id + 1]]]
+
+
+class BlockEdges(object):
+    '''Edges of a basic block which is not part of a CFG (see BasicBlock).
+
+    As before the edge index, the block keeps its own incoming and outgoing
+    lists, by function key, and the neighbours are the block objects. It has
+    the interface of EdgeIndex used by BasicBlock; the block ids are ignored.
+    '''
+
+    def __init__(self):
+        # key -> list(BasicBlock)
+        self._outgoing = {}
+        self._incoming = {}
+
+    def outgoing_of(self, bb_id, key):
+        return self._outgoing.get(key, [])
+
+    def incoming_of(self, bb_id, key):
+        return self._incoming.get(key, [])
+
+    def outgoing_by_key(self, bb_id):
+        return self._outgoing
+
+    def incoming_by_key(self, bb_id):
+        return self._incoming
+
+    def neighbours(self, bb_id, key=None, incoming=False):
+        lists = self._incoming if incoming else self._outgoing
+        if key is not None:
+            return list(lists.get(key, []))
+        bbs = []
+        for sublist in lists.values():
+            for bb in sublist:
+                if bb not in bbs:
+                    bbs.append(bb)
+        return bbs
+
+    def add_outgoing(self, src, dst, key):
+        bbs = self._outgoing.setdefault(key, [])
+        if dst not in bbs:
+            bbs.append(dst)
+
+    def add_incoming(self, dst, src, key):
+        bbs = self._incoming.setdefault(key, [])
+        if src not in bbs:
+            bbs.append(src)
+
+    def set_outgoing(self, bb, key, sons):
+        self._outgoing[key] = []
+        for son in sons:
+            self.add_outgoing(bb, son, key)
+
+    def set_incoming(self, bb, key, fathers):
+        self._incoming[key] = []
+        for father in fathers:
+            self.add_incoming(bb, father, key)
+
+    def remove(self, bb, key):
+        self._outgoing.pop(key, None)
+        self._incoming.pop(key, None)
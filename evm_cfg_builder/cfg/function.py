@@ -17,8 +17,11 @@ class Function(object):
         else:
             self._name = hex(hash_id)
         self._basic_blocks = []
+        self._cut_off_blocks = []
         self._attributes = []
         self._cfg = cfg
+        # True once the CFG of the function is computed
+        self._analyzed = False
 
     def __repr__(self):
         return '<cfg Function@{:x}>'.format(self.start_addr)
@@ -43,17 +46,50 @@ class Function(object):
     def name(self, n):
         self._name = n
 
+    @property
+    def analyzed(self):
+        '''
+        Returns
+            bool: True if the CFG of the function is computed
+        '''
+        return self._analyzed
+
     @property
     def basic_blocks(self):
         '''
+        The CFG of the function is computed on the first access
         Returns
             list(BasicBlock)
         '''
+        if not self._analyzed and self._cfg is not None:
+            self._cfg.analyze_functions([self])
         return self._basic_blocks
 
     @basic_blocks.setter
     def basic_blocks(self, bbs):
         self._basic_blocks = bbs
+        self._analyzed = True
+
+    @property
+    def cut_off_blocks(self):
+        '''
+        Basic blocks not analyzed, if the analysis stopped before its end (see AnalysisBudget)
+        Returns
+            list(BasicBlock)
+        '''
+        return self._cut_off_blocks
+
+    @cut_off_blocks.setter
+    def cut_off_blocks(self, bbs):
+        self._cut_off_blocks = bbs
+
+    @property
+    def incomplete(self):
+        '''
+        Returns
+            bool: True if the CFG of the function is partial
+        '''
+        return bool(self._cut_off_blocks)
 
     @property
     def entry(self):
@@ -140,9 +176,23 @@ class Function(object):
         attrs = ''
         if self.attributes:
             attrs = ", " + ",".join(self.attributes)
-        return '{}, {} #bbs {}'.format(self.name, len(self.basic_blocks), attrs)
+        if self.incomplete:
+            attrs += ", incomplete"
+        # Do not compute the CFG to print the function
+        return '{}, {} #bbs {}'.format(self.name, len(self._basic_blocks), attrs)
 
     def output_to_dot(self, base_filename):
+        '''
+        Export the CFG of the function, as computed so far. The CFG is not
+        computed by the export (see CFG.analyze_functions)
+        '''
+        if self._cfg is None:
+            self._output_to_dot(base_filename)
+            return
+        with self._cfg.stats.timer('output_to_dot'):
+            self._output_to_dot(base_filename)
+
+    def _output_to_dot(self, base_filename):
 
         if self.key == Function.DISPATCHER_ID:
             self.output_dispatcher_to_dot(base_filename)
@@ -150,20 +200,20 @@ class Function(object):
 
         with open('{}{}.dot'.format(base_filename, self.name), 'w') as f:
             f.write('digraph{\n')
-            for basic_block in self.basic_blocks:
+            for basic_block in self._basic_blocks:
                 instructions = ['{}:{}'.format(hex(ins.pc),
                                                str(ins)) for ins in basic_block.instructions]
                 instructions = '\n'.join(instructions)
 
-                f.write('{}[label="{}"]\n'.format(basic_block.start.pc, instructions))
+                f.write('{}[label="{}"]\n'.format(basic_block.start_pc, instructions))
 
                 for son in basic_block.outgoing_basic_blocks(self.key):
-                    f.write('{} -> {}\n'.format(basic_block.start.pc, son.start.pc))
+                    f.write('{} -> {}\n'.format(basic_block.start_pc, son.start_pc))
 
                 if not basic_block.outgoing_basic_blocks(self.key):
                     if basic_block.ends_with_jump_or_jumpi():
                         logger.error('Missing branches {}:{}'.format(self.name,
-                                                                     hex(basic_block.end.pc)))
+                                                                     hex(basic_block.end_pc)))
 
             f.write('\n}')
 
@@ -173,20 +223,20 @@ class Function(object):
 
         with open('{}{}.dot'.format(base_filename, self.name), 'w') as f:
             f.write('digraph{\n')
-            for basic_block in self.basic_blocks:
+            for basic_block in self._basic_blocks:
                 instructions = ['{}:{}'.format(hex(ins.pc),
                                                str(ins)) for ins in basic_block.instructions]
                 instructions = '\n'.join(instructions)
 
-                f.write('{}[label="{}"]\n'.format(basic_block.start.pc, instructions))
+                f.write('{}[label="{}"]\n'.format(basic_block.start_pc, instructions))
 
                 for son in basic_block.outgoing_basic_blocks(self.key):
-                    f.write('{} -> {}\n'.format(basic_block.start.pc, son.start.pc))
+                    f.write('{} -> {}\n'.format(basic_block.start_pc, son.start_pc))
 
                 if not basic_block.outgoing_basic_blocks(self.key):
                     if basic_block.ends_with_jump_or_jumpi():
                         logger.error('Missing branches {}:{}'.format(self.name,
-                                                                     hex(basic_block.end.pc)))
+                                                                     hex(basic_block.end_pc)))
             for function in self._cfg.functions:
                 if function != self:
                     f.write('{}[label="Call {}"]\n'.format(function.start_addr, function.name))
@@ -0,0 +1,104 @@
+from array import array
+from bisect import bisect_left
+
+from pyevmasm import Instruction, instruction_tables, DEFAULT_FORK
+
+# Per opcode information, indexed by the opcode byte
+# Unknown opcodes are decoded as INVALID, as pyevmasm does
+_INSTRUCTION_ARGS = []
+for _opcode in range(256):
+    _ins = instruction_tables[DEFAULT_FORK].get(_opcode)
+    if _ins is None:
+        _ins = Instruction(_opcode, 'INVALID', 0, 0, 0, 0, 'Unspecified invalid instruction.')
+    _INSTRUCTION_ARGS.append((_opcode, _ins.semantics, _ins.operand_size, _ins.pops, _ins.pushes, _ins.fee, _ins.description))
+
+OPCODE_NAMES = [Instruction(*args).name for args in _INSTRUCTION_ARGS]
+OPERAND_SIZES = bytes(args[2] for args in _INSTRUCTION_ARGS)
+POPS = bytes(args[3] for args in _INSTRUCTION_ARGS)
+PUSHES = bytes(args[4] for args in _INSTRUCTION_ARGS)
+
+
+class InstructionTable(object):
+    '''Columnar representation of the instructions of a bytecode.
+
+    Only the pc and the opcode of each instruction are stored; the operand is
+    read from the bytecode, and the other attributes come from the opcode.
+    pyevmasm.Instruction objects are created on demand.
+    '''
+
+    def __init__(self, bytecode, pcs=None, opcodes=None):
+        '''
+        Args:
+            bytecode (bytes)
+            pcs (array): pc of each instruction
+            opcodes (bytearray): opcode of each instruction
+        '''
+        self._bytecode = bytecode
+        self._pcs = pcs if pcs is not None else array('I')
+        self._opcodes = opcodes if opcodes is not None else bytearray()
+
+    def __len__(self):
+        return len(self._pcs)
+
+    def index_of(self, pc):
+        '''
+            Return the index of the instruction at pc
+        Args:
+            pc (int)
+        Returns:
+            int, or None if no instruction starts at pc
+        '''
+        idx = bisect_left(self._pcs, pc)
+        if idx < len(self._pcs) and self._pcs[idx] == pc:
+            return idx
+        return None
+
+    def pc(self, idx):
+        return self._pcs[idx]
+
+    def opcode(self, idx):
+        return self._opcodes[idx]
+
+    def name(self, idx):
+        return OPCODE_NAMES[self._opcodes[idx]]
+
+    def operand_size(self, idx):
+        return OPERAND_SIZES[self._opcodes[idx]]
+
+    def operand(self, idx):
+        size = OPERAND_SIZES[self._opcodes[idx]]
+        if not size:
+            return None
+        start = self._pcs[idx] + 1
+        return int.from_bytes(self._bytecode[start:start + size], 'big')
+
+    def pops(self, idx):
+        return POPS[self._opcodes[idx]]
+
+    def pushes(self, idx):
+        return PUSHES[self._opcodes[idx]]
+
+    def instruction(self, idx):
+        '''
+            Create the pyevmasm.Instruction at the given index
+        Args:
+            idx (int)
+        Returns:
+            Instruction
+        '''
+        return Instruction(*_INSTRUCTION_ARGS[self._opcodes[idx]],
+                           operand=self.operand(idx),
+                           pc=self._pcs[idx])
+
+    def instructions(self, first=0, last=None):
+        '''
+            Create the pyevmasm.Instruction between two indexes (included)
+        Args:
+            first (int)
+            last (int)
+        Returns:
+            list(Instruction)
+        '''
+        if last is None:
+            last = len(self._pcs) - 1
+        return [self.instruction(idx) for idx in range(first, last + 1)]
@@ -0,0 +1,114 @@
+'''
+    Run the value analysis of several functions in worker processes
+
+    Each worker rebuilds the basic blocks from the bytecode, so only the
+    bytecode and the (hash_id, start_addr) of the functions are sent. The
+    results are expressed with the basic blocks' start pcs.
+
+    The contract budget left (see AnalysisBudget) is sent with the bytecode:
+    its time is shared by the workers, and its steps are split between the functions.
+'''
+import time
+from multiprocessing import Pool
+
+from evm_cfg_builder.value_analysis.value_set_analysis import StackValueAnalysis
+
+# CFG of the worker process, set by _init_worker
+_worker_cfg = None
+# Contract deadline (time.monotonic() value), set by _init_worker
+_worker_deadline = None
+
+
+def _init_worker(bytecode, optimization_enabled, budget, time_left):
+    global _worker_cfg, _worker_deadline
+    # Import here to avoid circular imports
+    from . import CFG
+    _worker_cfg = CFG(bytecode,
+                      remove_metadata=False,
+                      analyze=False,
+                      optimization_enabled=optimization_enabled,
+                      budget=budget)
+    _worker_cfg.compute_basic_blocks()
+    _worker_deadline = time.monotonic() + time_left if time_left is not None else None
+
+
+def _analyze_function(function_desc):
+    '''
+        Run the value analysis of a function in the worker
+    Args:
+        function_desc ((int, int, int)): hash_id, start_addr and steps left (None: no limit) of the function
+    Returns:
+        dict: result of the analysis, see export_function_edges, with 'basic_blocks', 'cut_off', 'time'
+        and 'counters'
+    '''
+    hash_id, start_addr, steps_left = function_desc
+    cfg = _worker_cfg
+    deadline = None
+    max_steps = None
+    if cfg.budget is not None:
+        time_left = None
+        if _worker_deadline is not None:
+            time_left = max(_worker_deadline - time.monotonic(), 0.)
+        (deadline, max_steps) = cfg.budget.function_limits(time_left, steps_left)
+    vsa = StackValueAnalysis(
+        cfg,
+        cfg.get_basic_block_at(start_addr),
+        hash_id,
+        enable_optimization=cfg.optimization_enabled,
+        max_steps=max_steps,
+        deadline=deadline
+    )
+    start = time.perf_counter()
+    bbs = vsa.analyze()
+    elapsed = time.perf_counter() - start
+    result = export_function_edges(cfg, hash_id)
+    result['basic_blocks'] = bbs
+    result['cut_off'] = vsa.cut_off
+    result['time'] = elapsed
+    result['counters'] = vsa.counters
+    return result
+
+
+def export_function_edges(cfg, key):
+    '''
+        Export the edges and the reachability of a function key
+    Args:
+        cfg (CFG)
+        key (int): function key
+    Returns:
+        dict: 'incoming' and 'outgoing' are lists of (start pc, list of start pcs),
+        'reacheable' is the list of the start pcs of the basic blocks reached
+    '''
+    edge_index = cfg.edge_index
+    incoming = [(edge_index.block(bb_id).start_pc, [father.start_pc for father in fathers])
+                for (bb_id, fathers) in sorted(edge_index.incoming(key).items())]
+    outgoing = [(edge_index.block(bb_id).start_pc, [son.start_pc for son in sons])
+                for (bb_id, sons) in sorted(edge_index.outgoing(key).items())]
+    reacheable = [bb.start_pc for bb in cfg.basic_blocks if key in bb.reacheable]
+    return {
+        'incoming': incoming,
+        'outgoing': outgoing,
+        'reacheable': reacheable
+    }
+
+
+def analyze_functions(cfg, functions, workers, time_left=None, function_steps=None):
+    '''
+        Run the value analysis of the functions in a pool of processes
+    Args:
+        cfg (CFG)
+        functions (list(Function))
+        workers (int): number of processes
+        time_left (float): seconds left for all the functions (None: no limit)
+        function_steps (list(int)): steps left for each function (None: no limit)
+    Returns:
+        list(dict): the result of each function, in the same order
+    '''
+    if function_steps is None:
+        function_steps = [None] * len(functions)
+    descs = [(function.hash_id, function.start_addr, steps)
+             for (function, steps) in zip(functions, function_steps)]
+    with Pool(workers,
+              initializer=_init_worker,
+              initargs=(cfg.bytecode, cfg.optimization_enabled, cfg.budget, time_left)) as pool:
+        return pool.map(_analyze_function, descs, chunksize=1)
@@ -0,0 +1,289 @@
+'''
+    Binary serialization of a CFG
+
+    All the integers are LEB128 varints (zigzag-encoded when signed).
+    Lists are prefixed by their length.
+
+        magic            b'EVMCFG'
+        version          varint
+        checksum         crc32 of the rest of the data, 4 bytes (big endian)
+        flags            varint (bit 0: optimization enabled)
+        bytecode         length, bytes
+        instructions     count, then the pc delta of each instruction
+        basic blocks     count, then the number of instructions of each block
+        strings          count, then (length, utf-8) of each string
+        functions        count, then for each function:
+                             hash_id (signed), start_addr, name (string index),
+                             attributes (list of string indexes),
+                             basic blocks (list of block ids),
+                             basic blocks cut off (list of block ids)
+        edges            for each function (same order):
+                             outgoing: count, then (block id, list of block ids)
+                             incoming: count, then (block id, list of block ids)
+                             reacheable: list of block ids
+
+    Blocks are identified by their index in address order. Opcodes and
+    JUMPDESTs are read back from the bytecode, so loading does not
+    disassemble the bytecode again.
+
+    Corrupted data (checksum mismatch, or ids out of bounds) raises
+    SerializationError.
+'''
+import zlib
+from array import array
+
+from .instruction_table import InstructionTable
+from .function import Function
+
+MAGIC = b'EVMCFG'
+VERSION = 3
+
+_FLAG_OPTIMIZATION = 1
+
+
+class SerializationError(Exception):
+    pass
+
+
+def _write_uvarint(out, value):
+    assert value >= 0
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _write_svarint(out, value):
+    _write_uvarint(out, (value << 1) if value >= 0 else ((-value) << 1) - 1)
+
+
+def _write_list(out, values):
+    _write_uvarint(out, len(values))
+    for value in values:
+        _write_uvarint(out, value)
+
+
+class _Reader(object):
+
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+
+    def uvarint(self):
+        data = self._data
+        result = 0
+        shift = 0
+        try:
+            while True:
+                byte = data[self._offset]
+                self._offset += 1
+                result |= (byte & 0x7f) << shift
+                if not byte & 0x80:
+                    return result
+                shift += 7
+        except IndexError:
+            raise SerializationError('Truncated data')
+
+    def svarint(self):
+        value = self.uvarint()
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+    def bytes(self, size):
+        if self._offset + size > len(self._data):
+            raise SerializationError('Truncated data')
+        value = bytes(self._data[self._offset:self._offset + size])
+        self._offset += size
+        return value
+
+    def list(self):
+        return [self.uvarint() for _ in range(self.uvarint())]
+
+    def index(self, size):
+        '''
+            Read an index in [0, size)
+        '''
+        value = self.uvarint()
+        if value >= size:
+            raise SerializationError('Index out of bounds {}'.format(value))
+        return value
+
+    def indexes(self, size):
+        return [self.index(size) for _ in range(self.uvarint())]
+
+    @property
+    def offset(self):
+        return self._offset
+
+
+def dumps(cfg):
+    '''
+        Serialize a CFG
+    Args:
+        cfg (CFG)
+    Returns:
+        bytes
+    '''
+    # The attributes of a function are set by its analysis, so the functions
+    # of a lazy CFG are analyzed before the string table is built
+    cfg.analyze_functions()
+
+    out = bytearray()
+    _write_uvarint(out, _FLAG_OPTIMIZATION if cfg.optimization_enabled else 0)
+
+    bytecode = cfg.bytecode
+    _write_uvarint(out, len(bytecode))
+    out += bytecode
+
+    table = cfg.instruction_table
+    _write_uvarint(out, len(table))
+    previous_pc = 0
+    for idx in range(len(table)):
+        pc = table.pc(idx)
+        _write_uvarint(out, pc - previous_pc)
+        previous_pc = pc
+
+    # The ids of the basic blocks follow the address order
+    basic_blocks = cfg.basic_blocks
+    _write_uvarint(out, len(basic_blocks))
+    for bb in basic_blocks:
+        _write_uvarint(out, bb._last - bb._first + 1)
+
+    strings = {}
+    for function in cfg.functions:
+        strings.setdefault(function.name, len(strings))
+        for attr in function.attributes:
+            strings.setdefault(attr, len(strings))
+    _write_uvarint(out, len(strings))
+    for string in strings:
+        encoded = string.encode('utf-8')
+        _write_uvarint(out, len(encoded))
+        out += encoded
+
+    functions = cfg.functions
+    _write_uvarint(out, len(functions))
+    for function in functions:
+        _write_svarint(out, function.hash_id)
+        _write_uvarint(out, function.start_addr)
+        _write_uvarint(out, strings[function.name])
+        _write_list(out, [strings[attr] for attr in function.attributes])
+        _write_list(out, [bb.id for bb in function.basic_blocks])
+        _write_list(out, [bb.id for bb in function.cut_off_blocks])
+
+    edge_index = cfg.edge_index
+    for function in functions:
+        key = function.key
+        for bbs_per_id in (edge_index.outgoing(key), edge_index.incoming(key)):
+            edges = sorted((bb_id, [x.id for x in bbs]) for (bb_id, bbs) in bbs_per_id.items())
+            _write_uvarint(out, len(edges))
+            for (block_id, dsts) in edges:
+                _write_uvarint(out, block_id)
+                _write_list(out, dsts)
+        _write_list(out, [bb.id for bb in basic_blocks if key in bb.reacheable])
+
+    header = bytearray(MAGIC)
+    _write_uvarint(header, VERSION)
+    header += zlib.crc32(out).to_bytes(4, 'big')
+    return bytes(header + out)
+
+
+def loads(cfg_class, data, signature_resolver=None):
+    '''
+        Deserialize a CFG
+    Args:
+        cfg_class (class): CFG class
+        data (bytes-like): serialized CFG (bytes, mmap, memoryview)
+        signature_resolver (SignatureResolver): if set, the functions are renamed with it
+    Returns:
+        CFG
+    '''
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise SerializationError('Not a serialized CFG')
+    reader = _Reader(data)
+    reader.bytes(len(MAGIC))
+    version = reader.uvarint()
+    if version != VERSION:
+        raise SerializationError('Unsupported version {}'.format(version))
+    checksum = int.from_bytes(reader.bytes(4), 'big')
+    with memoryview(data) as view:
+        if zlib.crc32(view[reader.offset:]) != checksum:
+            raise SerializationError('Invalid checksum')
+    flags = reader.uvarint()
+
+    bytecode = reader.bytes(reader.uvarint())
+
+    pcs = array('I')
+    pc = 0
+    for idx in range(reader.uvarint()):
+        delta = reader.uvarint()
+        if idx and not delta:
+            raise SerializationError('Invalid instruction pcs')
+        pc += delta
+        if pc >= len(bytecode):
+            raise SerializationError('Instruction out of the bytecode {}'.format(pc))
+        pcs.append(pc)
+    opcodes = bytearray(bytecode[pc] for pc in pcs)
+    table = InstructionTable(bytecode, pcs, opcodes)
+
+    blocks = []
+    first = 0
+    for _ in range(reader.uvarint()):
+        size = reader.uvarint()
+        if not size or first + size > len(pcs):
+            raise SerializationError('Invalid basic block size {}'.format(size))
+        blocks.append((first, first + size - 1))
+        first += size
+    if first != len(pcs):
+        raise SerializationError('Instructions outside the basic blocks')
+
+    strings = []
+    for _ in range(reader.uvarint()):
+        try:
+            strings.append(reader.bytes(reader.uvarint()).decode('utf-8'))
+        except UnicodeDecodeError:
+            raise SerializationError('Invalid string')
+
+    cfg = cfg_class(bytecode,
+                    remove_metadata=False,
+                    analyze=False,
+                    optimization_enabled=bool(flags & _FLAG_OPTIMIZATION),
+                    signature_resolver=signature_resolver)
+    cfg._set_basic_blocks(table, blocks)
+    basic_blocks = cfg.basic_blocks
+    n_blocks = len(basic_blocks)
+    n_strings = len(strings)
+
+    functions = []
+    for _ in range(reader.uvarint()):
+        hash_id = reader.svarint()
+        start_addr = reader.uvarint()
+        entry = cfg.get_basic_block_at(start_addr)
+        if entry is None:
+            raise SerializationError('No basic block at {}'.format(start_addr))
+        function = Function(hash_id, start_addr, entry, cfg)
+        function.name = strings[reader.index(n_strings)]
+        for attr in reader.indexes(n_strings):
+            function.add_attributes(strings[attr])
+        function.basic_blocks = [basic_blocks[block_id] for block_id in reader.indexes(n_blocks)]
+        function.cut_off_blocks = [basic_blocks[block_id] for block_id in reader.indexes(n_blocks)]
+        cfg.add_function(function)
+        functions.append(function)
+
+    for function in functions:
+        key = function.key
+        for _ in range(reader.uvarint()):
+            bb = basic_blocks[reader.index(n_blocks)]
+            bb.set_outgoing_basic_blocks(key, [basic_blocks[block_id] for block_id in reader.indexes(n_blocks)])
+        for _ in range(reader.uvarint()):
+            bb = basic_blocks[reader.index(n_blocks)]
+            bb.set_incoming_basic_blocks(key, [basic_blocks[block_id] for block_id in reader.indexes(n_blocks)])
+        for block_id in reader.indexes(n_blocks):
+            basic_blocks[block_id].reacheable.append(key)
+
+    if signature_resolver is not None:
+        cfg._resolve_names()
+
+    return cfg
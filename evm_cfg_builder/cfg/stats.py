@@ -0,0 +1,94 @@
+import time
+from contextlib import contextmanager
+
+
+class Stats(object):
+    '''Timers of the analysis phases of a CFG, and counters of the value
+    analysis of each function.
+
+    The phases are: convert_bytecode, remove_metadata, compute_basic_blocks,
+    compute_functions, resolve_names, analyze_functions and output_to_dot.
+    A phase can run several times (e.g. analyze_functions with the lazy
+    analysis); its total time and its number of runs are kept.
+    '''
+
+    def __init__(self):
+        # phase -> {'time': seconds, 'calls': int}
+        self._phases = {}
+        # hash_id -> counters of the function (see add_function)
+        self._functions = {}
+
+    @property
+    def phases(self):
+        return self._phases
+
+    @property
+    def functions(self):
+        return self._functions
+
+    @contextmanager
+    def timer(self, phase):
+        '''
+        Time a phase
+        Args:
+            phase (str)
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase, elapsed):
+        '''
+        Args:
+            phase (str)
+            elapsed (float): seconds
+        '''
+        if phase not in self._phases:
+            self._phases[phase] = {'time': 0., 'calls': 0}
+        self._phases[phase]['time'] += elapsed
+        self._phases[phase]['calls'] += 1
+
+    def add_function(self, function, elapsed, counters):
+        '''
+        Record the value analysis of a function
+        Args:
+            function (Function)
+            elapsed (float): seconds
+            counters (dict): see StackValueAnalysis.counters
+        '''
+        stats = {'name': function.name, 'time': elapsed}
+        stats.update(counters)
+        self._functions[function.hash_id] = stats
+
+    def slowest_functions(self, n=10):
+        '''
+        Returns
+            list(dict): counters of the n slowest functions
+        '''
+        return sorted(self._functions.values(), key=lambda stats: stats['time'], reverse=True)[:n]
+
+    def to_dict(self):
+        '''
+        Returns
+            dict: 'phases' and 'functions' (list, in the analysis order), with the times rounded to the microsecond
+        '''
+        phases = {phase: {'time': round(stats['time'], 6), 'calls': stats['calls']}
+                  for (phase, stats) in self._phases.items()}
+        functions = []
+        for (hash_id, stats) in self._functions.items():
+            stats = dict(stats, hash_id=hash_id)
+            stats['time'] = round(stats['time'], 6)
+            functions.append(stats)
+        return {'phases': phases, 'functions': functions}
+
+    def __str__(self):
+        lines = ['{}: {:.6f}s ({} calls)'.format(phase, stats['time'], stats['calls'])
+                 for (phase, stats) in self._phases.items()]
+        for stats in self.slowest_functions():
+            lines.append('{}: {:.6f}s, {} iterations, {} bb visits'.format(stats['name'],
+                                                                           stats['time'],
+                                                                           stats['iterations'],
+                                                                           stats['bb_visits']))
+        return '\n'.join(lines)
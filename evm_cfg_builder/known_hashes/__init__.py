@@ -0,0 +1,4 @@
+from .signature_db import SignatureDatabase
+from .resolver import SignatureResolver, default_resolver
+
+__all__ = ['SignatureDatabase', 'SignatureResolver', 'default_resolver']
@@ -0,0 +1,144 @@
+from functools import lru_cache
+
+from .known_hashes import known_hashes, lookup as lookup_bundled
+from .signature_db import SignatureDatabase, compile_signature_file, MAGIC
+
+
+def _open_signature_source(source):
+    '''
+        Convert a signature source to an object with a lookup(selector) method
+    Args:
+        source (str, dict, SignatureDatabase): path to a signature database or
+        a text signature file, a dict selector -> signature, or a database.
+        A text signature file is compiled to a database (see compile_signature_file)
+    '''
+    if isinstance(source, dict):
+        return _DictSource(source)
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            is_database = f.read(len(MAGIC)) == MAGIC
+        if is_database:
+            return SignatureDatabase(source)
+        return SignatureDatabase(compile_signature_file(source))
+    assert hasattr(source, 'lookup')
+    return source
+
+
+class _DictSource(object):
+
+    def __init__(self, signatures):
+        self._signatures = signatures
+
+    def lookup(self, selector):
+        return self._signatures.get(selector)
+
+
+class SignatureResolver(object):
+    '''Resolve function selectors to their signature.
+
+    The layers are looked up in order:
+        - the overrides (ex: the hashes provided by crytic-compile)
+        - the user databases, in the order they were added
+        - the bundled database
+
+    The overrides are a plain dict; the results of the other layers go
+    through a LRU cache of cache_size entries. The cache is cleared when
+    known_hashes is modified.
+    '''
+
+    def __init__(self, overrides=None, databases=None, use_bundled=True, cache_size=4096):
+        '''
+        Args:
+            overrides (dict): selector (int) -> signature (str)
+            databases (list): signature sources, see add_database
+            use_bundled (bool): use the bundled known_hashes database
+            cache_size (int): number of entries kept in the LRU cache
+        '''
+        self._overrides = dict(overrides) if overrides else dict()
+        self._layers = [_open_signature_source(database) for database in databases or []]
+        self._use_bundled = use_bundled
+        self._cache_size = cache_size
+        self._reset_cache()
+
+    def _reset_cache(self):
+        self._known_hashes_version = known_hashes.version
+        self._lookup_layers = lru_cache(maxsize=self._cache_size)(self._lookup_layers_uncached)
+
+    def __getstate__(self):
+        # The cache cannot be pickled
+        state = dict(self.__dict__)
+        del state['_lookup_layers']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_cache()
+
+    def add_overrides(self, signatures):
+        '''
+            Add per-run signatures, which take precedence over the databases
+        Args:
+            signatures (dict): selector (int) -> signature (str)
+        '''
+        self._overrides.update(signatures)
+
+    def add_database(self, source):
+        '''
+            Add a signature database. It is looked up after the previously
+            added ones, and before the bundled database
+        Args:
+            source (str, dict, SignatureDatabase): path to a signature database
+            (see signature_db.py) or to a text signature file, a dict
+            selector -> signature, or an object with a lookup(selector) method
+        '''
+        # The list is not modified in place, as it can be shared with derived resolvers
+        self._layers = self._layers + [_open_signature_source(source)]
+        self._reset_cache()
+
+    def _lookup_layers_uncached(self, selector):
+        for layer in self._layers:
+            signature = layer.lookup(selector)
+            if signature is not None:
+                return signature
+        if self._use_bundled:
+            return lookup_bundled(selector)
+        return None
+
+    def lookup(self, selector):
+        '''
+            Return the signature of a selector
+        Args:
+            selector (int)
+        Returns:
+            str, or None if the selector is unknown
+        '''
+        signature = self._overrides.get(selector)
+        if signature is not None:
+            return signature
+        if self._use_bundled and self._known_hashes_version != known_hashes.version:
+            self._reset_cache()
+        return self._lookup_layers(selector)
+
+    def derive(self, overrides):
+        '''
+            Return a new resolver sharing the databases of this one, with
+            additional overrides. It is used to resolve the names of one
+            contract without modifying the resolver
+        Args:
+            overrides (dict): selector (int) -> signature (str)
+        Returns:
+            SignatureResolver
+        '''
+        resolver = SignatureResolver.__new__(SignatureResolver)
+        resolver._overrides = dict(self._overrides)
+        resolver._overrides.update(overrides)
+        resolver._layers = self._layers
+        resolver._use_bundled = self._use_bundled
+        resolver._cache_size = self._cache_size
+        resolver._known_hashes_version = self._known_hashes_version
+        # Share the cache, as long as the layers are the same
+        resolver._lookup_layers = self._lookup_layers
+        return resolver
+
+
+default_resolver = SignatureResolver()
@@ -0,0 +1,212 @@
+'''
+    On-disk signature database
+
+    The database maps 4-byte function selectors to their text signature.
+    It is stored as a single file:
+
+        header   MAGIC (8 bytes), version (u16), reserved (u16), count (u32)
+        index    count records of (selector u32, offset u32), sorted by selector
+        blob     utf-8 signatures, concatenated
+
+    The end of a signature is the offset of the next record (or the end of the
+    file for the last one). All the integers are big-endian.
+
+    The file is memory-mapped and binary-searched on lookup, so opening it is
+    free and the pages are shared between processes.
+
+    Text signature files are compiled to a database once (see
+    compile_signature_file), and then looked up like the other databases.
+'''
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+MAGIC = b'EVMSIGDB'
+VERSION = 1
+
+_HEADER = struct.Struct('>8sHHI')
+_RECORD = struct.Struct('>II')
+_SELECTOR = struct.Struct('>I')
+
+
+class SignatureDatabase(object):
+    '''Read-only, memory-mapped signature database.
+
+    The file is only opened on the first lookup.
+    '''
+
+    def __init__(self, path):
+        self._path = path
+        self._mmap = None
+        self._count = 0
+        self._blob_start = 0
+
+    def __repr__(self):
+        return '<SignatureDatabase {}>'.format(self._path)
+
+    @property
+    def path(self):
+        return self._path
+
+    def _open(self):
+        if self._mmap is not None:
+            return
+        with open(self._path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            raise ValueError('{} is not a signature database'.format(self._path))
+        self._count = count
+        self._blob_start = _HEADER.size + count * _RECORD.size
+        self._mmap = mm
+
+    def __getstate__(self):
+        # The file is mapped again on the next lookup
+        state = dict(self.__dict__)
+        state['_mmap'] = None
+        return state
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __len__(self):
+        self._open()
+        return self._count
+
+    def _signature_at(self, idx):
+        '''
+            Return the signature of the idx-th record
+        Args:
+            idx (int)
+        Returns:
+            str
+        '''
+        _, start = _RECORD.unpack_from(self._mmap, _HEADER.size + idx * _RECORD.size)
+        if idx + 1 < self._count:
+            _, end = _RECORD.unpack_from(self._mmap, _HEADER.size + (idx + 1) * _RECORD.size)
+        else:
+            end = len(self._mmap) - self._blob_start
+        return self._mmap[self._blob_start + start:self._blob_start + end].decode('utf-8')
+
+    def lookup(self, selector):
+        '''
+            Binary search the selector
+        Args:
+            selector (int)
+        Returns:
+            str, or None if the selector is unknown
+        '''
+        self._open()
+        if not 0 <= selector <= 0xffffffff:
+            return None
+        mm = self._mmap
+        lo = 0
+        hi = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            (current,) = _SELECTOR.unpack_from(mm, _HEADER.size + mid * _RECORD.size)
+            if current < selector:
+                lo = mid + 1
+            elif current > selector:
+                hi = mid
+            else:
+                return self._signature_at(mid)
+        return None
+
+    def __contains__(self, selector):
+        return self.lookup(selector) is not None
+
+    def items(self):
+        '''
+            Iterate over all the (selector, signature) pairs, in selector order
+        '''
+        self._open()
+        for idx in range(self._count):
+            (selector,) = _SELECTOR.unpack_from(self._mmap, _HEADER.size + idx * _RECORD.size)
+            yield selector, self._signature_at(idx)
+
+
+def write_signature_db(path, signatures):
+    '''
+        Write a signature database
+    Args:
+        path (str)
+        signatures (dict): selector (int) -> signature (str)
+    '''
+    index = bytearray()
+    blob = bytearray()
+    for selector in sorted(signatures):
+        index += _RECORD.pack(selector, len(blob))
+        blob += signatures[selector].encode('utf-8')
+
+    # Several processes can write the same database
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, len(signatures)))
+            f.write(index)
+            f.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_signature_file(path):
+    '''
+        Read a text signature file. Each line is "selector signature", where the
+        selector is an hexadecimal string (ex: "0xa9059cbb transfer(address,uint256)")
+        Empty lines and lines starting with # are ignored
+    Args:
+        path (str)
+    Returns:
+        dict: selector (int) -> signature (str)
+    '''
+    signatures = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            selector, signature = line.split(None, 1)
+            signatures[int(selector, 16)] = signature.strip()
+    return signatures
+
+
+def compile_signature_file(path, directory=None):
+    '''
+        Compile a text signature file to a database, unless it was already
+        compiled. The database is named after the path, the size and the
+        modification time of the file, so it is compiled again if the file changes.
+
+        The file is read in memory during the compilation only; the lookups
+        go through the memory-mapped database.
+    Args:
+        path (str): text signature file, see read_signature_file
+        directory (str): directory of the databases (default: evm-cfg-builder in the temporary directory)
+    Returns:
+        str: path of the database
+    '''
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'evm-cfg-builder')
+    os.makedirs(directory, exist_ok=True)
+
+    stat = os.stat(path)
+    h = hashlib.sha256(repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns, VERSION)).encode())
+    db_path = os.path.join(directory, h.hexdigest() + '.db')
+    if not os.path.exists(db_path):
+        write_signature_db(db_path, read_signature_file(path))
+    return db_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage python -m evm_cfg_builder.known_hashes.signature_db signatures.txt output.db')
+        exit(-1)
+    write_signature_db(sys.argv[2], read_signature_file(sys.argv[1]))
@@ -0,0 +1,139 @@
+'''
+    Stack effect of the basic blocks
+
+    A basic block is compiled once into a summary of its effect on the
+    stack, expressed on its input elements (0 is the top of the stack):
+
+        (INPUT, k)          the k-th input element
+        (CONST, value)      a concrete value (None if unknown)
+        (AND, e1, e2)       the AND between two expressions
+
+    The summary is only valid if the stack has at least `required` elements:
+    with a shorter stack, the instructions reach the bottom of the stack
+    and the analysis has to interpret them one by one.
+'''
+import weakref
+
+from evm_cfg_builder.value_analysis import opcodes
+from evm_cfg_builder.value_analysis.opcodes import OPCODE_EFFECTS
+
+INPUT = 0
+CONST = 1
+AND = 2
+
+_UNKNOWN = (CONST, None)
+
+
+class BlockSummary(object):
+    '''Stack effect of a basic block
+
+    Applying the summary removes the `consumed` top elements, and pushes
+    `outputs` (from the bottom to the top). jump_target is the value on the
+    top of the stack before the last JUMP/JUMPI, or None.
+    '''
+
+    __slots__ = ('required', 'consumed', 'outputs', 'jump_target')
+
+    def __init__(self, required, consumed, outputs, jump_target):
+        self.required = required
+        self.consumed = consumed
+        self.outputs = outputs
+        self.jump_target = jump_target
+
+    def __repr__(self):
+        return '<BlockSummary required={} consumed={} outputs={}>'.format(self.required,
+                                                                       self.consumed,
+                                                                       self.outputs)
+
+
+def compile_block(bb):
+    '''
+        Compute the summary of a basic block, following the same transfer
+        function as StackValueAnalysis._transfer_func_ins (see opcodes.py)
+    Args:
+        bb (BasicBlock)
+    Returns:
+        BlockSummary
+    '''
+    table = bb.instruction_table
+    # Expressions above the inputs that are not consumed, from the bottom to the top
+    stack = []
+    consumed = 0
+
+    def pop():
+        nonlocal consumed
+        if stack:
+            return stack.pop()
+        consumed += 1
+        return (INPUT, consumed - 1)
+
+    def reach(n):
+        # Make sure the n top elements are expressions of the stack
+        nonlocal consumed
+        while len(stack) < n:
+            stack.insert(0, (INPUT, consumed))
+            consumed += 1
+
+    jump_target = None
+    indexes = bb.instruction_indexes
+    last = indexes[-1]
+    for idx in indexes:
+        if idx == last and table.name(idx) in ('JUMP', 'JUMPI'):
+            reach(1)
+            jump_target = stack[-1]
+
+        (kind, arg) = OPCODE_EFFECTS[table.opcode(idx)]
+        if kind == opcodes.PUSH:
+            stack.append((CONST, table.operand(idx)))
+        elif kind == opcodes.SWAP:
+            reach(arg + 1)
+            stack[-1], stack[-1 - arg] = stack[-1 - arg], stack[-1]
+        elif kind == opcodes.DUP:
+            reach(arg)
+            stack.append(stack[-arg])
+        elif kind == opcodes.AND:
+            v1 = pop()
+            v2 = pop()
+            stack.append((AND, v1, v2))
+        else:
+            (n_pop, n_push) = arg
+            for _ in range(n_pop):
+                pop()
+            for _ in range(n_push):
+                stack.append(_UNKNOWN)
+
+    # The analysis reads the top of the stack after a JUMP/JUMPI
+    if jump_target is not None:
+        reach(1)
+
+    required = consumed
+    # The bottom expressions that are the input under them are left in place
+    while stack and stack[0] == (INPUT, consumed - 1):
+        stack.pop(0)
+        consumed -= 1
+
+    return BlockSummary(required, consumed, tuple(stack), jump_target)
+
+
+# Summaries of the basic blocks of a CFG, shared by all its analyses
+_summaries = weakref.WeakKeyDictionary()
+
+
+def get_block_summary(cfg, bb):
+    '''
+        Return the summary of a basic block, computed once per CFG
+    Args:
+        cfg (CFG)
+        bb (BasicBlock)
+    Returns:
+        BlockSummary
+    '''
+    summaries = _summaries.get(cfg)
+    if summaries is None:
+        summaries = {}
+        _summaries[cfg] = summaries
+    summary = summaries.get(bb)
+    if summary is None:
+        summary = compile_block(bb)
+        summaries[bb] = summary
+    return summary
@@ -0,0 +1,34 @@
+'''
+    Stack effect of each opcode, as seen by the value analysis
+
+    OPCODE_EFFECTS is indexed by the opcode byte, and contains (kind, arg):
+
+        (PUSH, None)            push the operand
+        (SWAP, n)               SWAPn
+        (DUP, n)                DUPn
+        (AND, None)             AND between the two top elements
+        (OTHER, (pops, pushes)) pop elements, and push unknown values
+'''
+from evm_cfg_builder.cfg.instruction_table import OPCODE_NAMES, POPS, PUSHES
+
+PUSH = 0
+SWAP = 1
+DUP = 2
+AND = 3
+OTHER = 4
+
+
+def _effect(opcode):
+    name = OPCODE_NAMES[opcode]
+    if name.startswith('PUSH'):
+        return (PUSH, None)
+    if name.startswith('SWAP'):
+        return (SWAP, int(name[4:]))
+    if name.startswith('DUP'):
+        return (DUP, int(name[3:]))
+    if name == 'AND':
+        return (AND, None)
+    return (OTHER, (POPS[opcode], PUSHES[opcode]))
+
+
+OPCODE_EFFECTS = [_effect(opcode) for opcode in range(256)]
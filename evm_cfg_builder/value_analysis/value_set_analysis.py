@@ -1,19 +1,16 @@
+import heapq
 import itertools
-from typing import Dict, List, Set, Optional
+import time
+import weakref
+from typing import Dict, List, Optional, FrozenSet
 
 from evm_cfg_builder.cfg.function import Function
+from evm_cfg_builder.value_analysis import opcodes
+from evm_cfg_builder.value_analysis.block_summary import INPUT, CONST, get_block_summary
 
-BASIC_BLOCK_END = ['STOP',
-                   'SELFDESTRUCT',
-                   'RETURN',
-                   'REVERT',
-                   'INVALID',
-                   'SUICIDE',
-                   'JUMP',
-                   'JUMPI']
 
-class AbsStackElem(object):
-    '''Represent an element of the stack
+class AbsValueDomain(object):
+    '''Abstract values of the stack elements
 
     An element is a set of potential values.
     There are at max MAXVALS number of values, otherwise it is set to TOP
@@ -30,138 +27,292 @@ class AbsStackElem(object):
 
     Thus our analysis is an under-approximation of an over-approximation
     and is not sound.
-    '''
-
 
+    The elements are interned frozensets (or None for TOP), and are only
+    created and combined through the domain. If authorized_values is set,
+    only the values inside it are kept, the others are unknown (None).
+    '''
 
-    def __init__(self, auhtorized_values, vals=None):
-        if vals:
-            self._vals = vals
-        else:
-            self._vals = set()
-        self._authorized_values = auhtorized_values
+    def __init__(self, authorized_values):
+        self._authorized_values = authorized_values
 
         # Maximum number of values inside the set. If > MAXVALS -> TOP
         self._max_number_of_elements = 100
         if self._authorized_values:
             # If we know the set of targets, we can change the max number of elements in the set
-            self._max_number_of_elements = len(auhtorized_values)
+            self._max_number_of_elements = len(authorized_values)
 
+        self._interned = {}
+        self._constants = {}
+        self._and_cache = {}
 
-    def append(self, nbr):
-        '''
-            Append value to the element
+        self.top = None
+        self.empty = self._make(frozenset())
+        self.unknown = self.constant(None)
 
-        Args:
-            nbr (int, None)
-        '''
+    @property
+    def authorized_values(self):
+        return self._authorized_values
+
+    def _make(self, vals):
+        return self._interned.setdefault(vals, vals)
+
+    def _filter(self, nbr):
         # Optimization enabled
         if self._authorized_values:
             # Only keep track of values that are JMPDEST
             if nbr in self._authorized_values:
-                self._vals.add(nbr)
-            # Only Add None if its not present; avoid the list to grow up on unknown values
-            elif None not in self._authorized_values:
-                self._vals.add(None)
-        else:
-            self._vals.add(nbr)
+                return nbr
+            return None
+        return nbr
 
-    def get_vals(self) -> Optional[Set[int]]:
+    def constant(self, nbr):
         '''
-            Return the values. The return must be checked for TOP (None)
+            Return the element containing a single value
+        Args:
+            nbr (int, None)
+        '''
+        elem = self._constants.get(nbr)
+        if elem is None:
+            elem = self._make(frozenset([self._filter(nbr)]))
+            self._constants[nbr] = elem
+        return elem
 
+    def get_vals(self, elem) -> Optional[FrozenSet[int]]:
+        '''
+            Return the values. The return must be checked for TOP (None)
         Returns:
-            set of int, or None
+            frozenset of int, or None
         '''
-        return self._vals
+        return elem
 
-    def set_vals(self, vals):
+    def absAnd(self, elem1, elem2):
         '''
-            Set the values
-        Args:
-            vals (set of int, or None): List of values, or TOP
+            AND between two elements. If one of them is TOP, returns TOP
         '''
-        self._vals = vals
+        key = (elem1, elem2)
+        if key in self._and_cache:
+            return self._and_cache[key]
 
-    def absAnd(self, elem):
+        if elem1 is None or elem2 is None:
+            result = None
+        else:
+            vals = set()
+            for (a, b) in itertools.product(elem1, elem2):
+                if a is None or b is None:
+                    vals.add(None)
+                else:
+                    vals.add(self._filter(a & b))
+            result = self._make(frozenset(vals))
+        self._and_cache[key] = result
+        return result
+
+    def merge(self, elem1, elem2):
         '''
-            AND between two AbsStackElem
-        Args:
-            elem (AbsStackElem)
-        Returns:
-            AbsStackElem: New object containing the result of the AND between
-            the values. If one of the absStackElem is TOP, returns TOP
-        '''
-        newElem = AbsStackElem(self._authorized_values)
-        v1 = self.get_vals()
-        v2 = elem.get_vals()
-        if v1 is None or v2 is None:
-            newElem.set_vals(None)
-            return newElem
-
-        for (a, b) in itertools.product(v1, v2):
-            if a is None or b is None:
-                newElem.append(None)
-            else:
-                newElem.append(a & b)
-
-        return newElem
-
-    def merge(self, elem):
+            Merge between two elements. If one of them is TOP, or if there are
+            too many values, returns TOP
         '''
-            Merge between two AbsStackElem
-        Args:
-            elem (AbsStackElem)
-        Returns:
-            AbsStackElem: New object containing the result of the merge
-                          If one of the absStackElem is TOP, returns TOP
-        '''
-        newElem = AbsStackElem(self._authorized_values)
-        v1 = self.get_vals()
-        v2 = elem.get_vals()
-        if v1 is None or v2 is None:
-            newElem.set_vals(None)
-            return newElem
-        vals = set(v1 | v2)
+        if elem1 is None or elem2 is None:
+            return None
+        vals = elem1 | elem2
         if len(vals) > self._max_number_of_elements:
-            vals = None
-        newElem.set_vals(vals)
-        return newElem
+            return None
+        return self._make(vals)
 
-    def equals(self, elems):
+    def is_normalized(self, elem):
+        '''
+            Return False if the element is TOP, or has too many values
         '''
-            Return True if equal
+        return elem is not None and len(elem) <= self._max_number_of_elements
 
+    def join(self, elems):
+        '''
+            Merge elements. If one of the merged values is TOP, or if there
+            are too many values, the merged element is empty
         Args:
-            elem (AbsStackElem)
+            elems (list of elements)
         Returns:
-            bool: True if the two absStackElem are equals. If both are TOP
-            returns True
+            element
         '''
+        vals = set()
+        for elem in elems:
+            if elem is None:
+                return self.empty
+            vals |= elem
+        if len(vals) > self._max_number_of_elements:
+            return self.empty
+        return self._make(frozenset(vals))
 
-        v1 = self.get_vals()
-        v2 = elems.get_vals()
 
-        return v1 == v2
+class BitmaskValueDomain(AbsValueDomain):
+    '''Abstract values encoded as bitmasks over the authorized values
 
-    def get_copy(self):
-        '''
-            Return of copy of the object
-        Returns:
-            AbsStackElem
-        '''
-        cp = AbsStackElem(self._authorized_values, self._vals)
-        return cp
+    Used when the optimization is enabled: the authorized values (JUMPDESTs)
+    are numbered once, and an element is an int where bit i is set if the
+    i-th authorized value is possible, and bit n (n = number of authorized
+    values) if an unknown value is possible. TOP is -1.
 
-    def __str__(self):
-        '''
-            String representation
-        Returns:
-            str
-        '''
-        return str(self._vals)
+    Merging is a bitwise OR, and the comparison of elements is an int
+    comparison. An element has too many values only if all the bits are set.
+    '''
+
+    def __init__(self, authorized_values):
+        assert authorized_values
+        self._values = sorted(authorized_values) + [None]
+        self._bits = {value: 1 << idx for (idx, value) in enumerate(self._values)}
+        self._unknown_bit = 1 << (len(self._values) - 1)
+        self._full = (1 << len(self._values)) - 1
+        self._vals_cache = {}
+        super(BitmaskValueDomain, self).__init__(authorized_values)
+        self.top = -1
+        self.empty = 0
+
+    def _make(self, vals):
+        mask = 0
+        for value in vals:
+            mask |= self._bits[value]
+        return mask
+
+    def constant(self, nbr):
+        return self._bits.get(nbr, self._unknown_bit)
+
+    def get_vals(self, elem):
+        if elem < 0:
+            return None
+        vals = self._vals_cache.get(elem)
+        if vals is None:
+            vals = frozenset(value for (idx, value) in enumerate(self._values) if elem >> idx & 1)
+            self._vals_cache[elem] = vals
+        return vals
+
+    def absAnd(self, elem1, elem2):
+        key = (elem1, elem2)
+        result = self._and_cache.get(key)
+        if result is None:
+            result = super(BitmaskValueDomain, self).absAnd(self.get_vals(elem1), self.get_vals(elem2))
+            if result is None:
+                result = -1
+            self._and_cache[key] = result
+        return result
+
+    def merge(self, elem1, elem2):
+        # -1 | x is -1
+        mask = elem1 | elem2
+        if mask == self._full:
+            return -1
+        return mask
+
+    def is_normalized(self, elem):
+        return -1 < elem < self._full
+
+    def join(self, elems):
+        mask = 0
+        for elem in elems:
+            mask |= elem
+        if -1 < mask < self._full:
+            return mask
+        return 0
+
+
+# Domains shared by the analyses of a CFG, see get_value_domain
+_domains = weakref.WeakKeyDictionary()
+
+
+def get_value_domain(cfg, enable_optimization):
+    '''
+        Return the domain of the stack values of a CFG.
+        The domain (and its caches) is shared by all the analyses of the CFG
+    Args:
+        cfg (CFG)
+        enable_optimization (bool): if True, only keep track of the JUMPDESTs
+    Returns:
+        AbsValueDomain
+    '''
+    if not enable_optimization:
+        return AbsValueDomain(None)
+    authorized_values = cfg.jumpdests
+    domain = _domains.get(cfg)
+    if domain is None or domain.authorized_values is not authorized_values:
+        if authorized_values:
+            domain = BitmaskValueDomain(authorized_values)
+        else:
+            domain = AbsValueDomain(authorized_values)
+        _domains[cfg] = domain
+    return domain
+
+
+class _StackNode(object):
+    '''Cell of a persistent stack: an element, and the rest of the stack
+
+    The cells are never modified, so they are shared between the stacks.
+    normalized caches whether all the elements down to the bottom are
+    normalized (see AbsValueDomain.is_normalized)
+    '''
+
+    __slots__ = ('elem', 'next', 'depth', 'normalized')
+
+    def __init__(self, elem, next_node):
+        self.elem = elem
+        self.next = next_node
+        self.depth = next_node.depth + 1 if next_node is not None else 1
+        self.normalized = None
+
+
+def _build_nodes(elems, node=None):
+    '''
+        Push elements (from bottom to top) on a node
+    '''
+    for elem in elems:
+        node = _StackNode(elem, node)
+    return node
+
+
+def _is_normalized(node, domain):
+    '''
+        Return True if all the elements from the node to the bottom are
+        normalized. The result is cached on the nodes
+    '''
+    to_compute = []
+    while node is not None and node.normalized is None:
+        to_compute.append(node)
+        node = node.next
+    normalized = node.normalized if node is not None else True
+    for node in reversed(to_compute):
+        normalized = normalized and domain.is_normalized(node.elem)
+        node.normalized = normalized
+    return normalized
+
+
+def _normalize(node, domain):
+    '''
+        Return a stack where all the elements are normalized (TOP and
+        elements with too many values are replaced by empty elements).
+        The normalized bottom of the stack is shared
+    '''
+    top_elems = []
+    while not _is_normalized(node, domain):
+        elem = node.elem
+        top_elems.append(elem if domain.is_normalized(elem) else domain.empty)
+        node = node.next
+    return _build_nodes(reversed(top_elems), node)
 
 
+def _evaluate(expr, inputs, domain):
+    '''
+        Evaluate an expression of a BlockSummary
+    Args:
+        expr (tuple)
+        inputs (list): input elements, from the top of the stack
+        domain (AbsValueDomain)
+    Returns:
+        element of the domain
+    '''
+    kind = expr[0]
+    if kind == INPUT:
+        return inputs[expr[1]]
+    if kind == CONST:
+        return domain.constant(expr[1])
+    return domain.absAnd(_evaluate(expr[1], inputs, domain), _evaluate(expr[2], inputs, domain))
 
 
 class Stack(object):
@@ -170,18 +321,29 @@ class Stack(object):
         The stack is updated throyugh the push/pop/dup operation, and returns
         itself
         We keep the same stack for one basic block, to reduce the memory usage
+
+        The stack is a persistent linked list of immutable elements:
+        push/pop/dup/swap create new cells on top of the existing ones, so
+        copies share their cells, and merge/equals only walk the region
+        where the stacks differ
     '''
 
-    def __init__(self, authorized_values):
-        self._elems = []
-        self._authorized_values = authorized_values
+    def __init__(self, domain):
+        self._head = None
+        self._domain = domain
+
+    @property
+    def domain(self):
+        return self._domain
 
     @property
     def authorized_values(self):
-        return self._authorized_values
+        return self._domain.authorized_values
 
     def depth(self) -> int:
-        return len(self._elems)
+        if self._head is None:
+            return 0
+        return self._head.depth
 
     def copy_stack(self, stack):
         '''
@@ -190,42 +352,39 @@ class Stack(object):
         Args:
             Stack: stack to copy
         '''
-        self._elems = [x.get_copy() for x in stack.get_elems()]
+        self._head = stack._head
 
     def push(self, elem):
         '''
-            Push an elem. If the elem is not an AbsStackElem, create a new
-            AbsStackElem
+            Push an elem
         Args:
-            elem (AbsStackElem, or str or None): If str, it should be the
-            hexadecimal repr
+            elem: element of the domain (see push_value)
         '''
-        if not isinstance(elem, AbsStackElem):
-            st = AbsStackElem(self.authorized_values)
-            st.append(elem)
-            elem = st
+        self._head = _StackNode(elem, self._head)
 
-        self._elems.append(elem)
+    def push_value(self, nbr):
+        '''
+            Push a concrete value
+        Args:
+            nbr (int, or None if unknown)
+        '''
+        self._head = _StackNode(self._domain.constant(nbr), self._head)
 
     def insert(self, elem):
-        if not isinstance(elem, AbsStackElem):
-            st = AbsStackElem(self.authorized_values)
-            st.append(elem)
-            elem = st
-
-        self._elems.insert(0, elem)
-
+        self.set_elems([elem] + self.get_elems())
 
     def pop(self):
         '''
             Pop an element.
         Returns:
-            AbsStackElem
+            element of the domain
         '''
-        if not self._elems:
-            self.push(None)
+        head = self._head
+        if head is None:
+            return self._domain.unknown
 
-        return self._elems.pop()
+        self._head = head.next
+        return head.elem
 
     def swap(self, n):
         '''
@@ -233,69 +392,92 @@ class Stack(object):
         Args:
             n (int)
         '''
-        if len(self._elems) >= (n+1):
-            elem = self._elems[-1-n]
-            top = self.top()
-            self._elems[-1] = elem
-            self._elems[-1-n] = top
+        if self.depth() >= (n+1):
+            elems = []
+            node = self._head
+            for _ in range(n + 1):
+                elems.append(node.elem)
+                node = node.next
+            elems[0], elems[n] = elems[n], elems[0]
+            self._head = _build_nodes(reversed(elems), node)
 
         # if we swap more than the size of the stack,
         # we can assume that elements are missing on the stack
         else:
             top = self.top()
-            missing_elems = n - len(self._elems) + 1
-            for _ in range(0, missing_elems):
-                self.insert(None)
-            self._elems[-1-n] = top
+            elems = self.get_elems()
+            missing_elems = n - len(elems) + 1
+            elems = [self._domain.unknown] * missing_elems + elems
+            elems[-1-n] = top
+            self.set_elems(elems)
 
     def dup(self, n):
         '''
             Dup operation
         '''
-        if len(self._elems) >= n:
-            self.push(self._elems[-n])
+        if self.depth() >= n:
+            node = self._head
+            for _ in range(n - 1):
+                node = node.next
+            self.push(node.elem)
         else:
-            self.push(None)
+            self.push(self._domain.unknown)
 
-    def get_elems(self) -> List[AbsStackElem]:
+    def apply_summary(self, summary):
+        '''
+            Apply the stack effect of a basic block
+        Args:
+            summary (BlockSummary)
+        Returns:
+            (bool, element): False if the stack is too short for the summary,
+            in which case the stack is not modified. The element is the target
+            of the last JUMP/JUMPI (None if the block does not end with a jump)
+        '''
+        node = self._head
+        if node is None or node.depth < summary.required:
+            return (False, None)
+
+        inputs = []
+        bottom = None
+        consumed = summary.consumed
+        for i in range(summary.required):
+            if i == consumed:
+                bottom = node
+            inputs.append(node.elem)
+            node = node.next
+        if bottom is None:
+            bottom = node
+
+        domain = self._domain
+        jump_target = None
+        if summary.jump_target is not None:
+            jump_target = _evaluate(summary.jump_target, inputs, domain)
+        for expr in summary.outputs:
+            bottom = _StackNode(_evaluate(expr, inputs, domain), bottom)
+        self._head = bottom
+        return (True, jump_target)
+
+    def get_elems(self) -> List:
         '''
             Returns the stack elements
         Returns:
-            List AbsStackElem
+            List of elements, from the bottom to the top
         '''
-        return self._elems
+        elems = []
+        node = self._head
+        while node is not None:
+            elems.append(node.elem)
+            node = node.next
+        elems.reverse()
+        return elems
 
     def set_elems(self, elems):
         '''
             Set the stack elements
         Args:
-            elems (list of AbsStackElem)
+            elems (list of elements): from the bottom to the top
         '''
-        self._elems = elems
-
-    def merge(self, stack):
-        '''
-            Merge two stack. Returns a new object
-        Arg:
-            stack (Stack)
-        Returns: New object representing the merge
-        '''
-        newSt = Stack(self.authorized_values)
-        elems1 = self.get_elems()
-        elems2 = stack.get_elems()
-        # We look for the longer stack
-        if len(elems2) <= len(elems1):
-            longStack = elems1
-            shortStack = elems2
-        else:
-            longStack = elems2
-            shortStack = elems1
-        longStack = [x.get_copy() for x in longStack]
-        # Merge elements
-        for i in range(0, len(shortStack)):
-            longStack[-(i+1)] = longStack[-(i+1)].merge(shortStack[-(i+1)])
-        newSt.set_elems(longStack)
-        return newSt
+        self._head = _build_nodes(elems)
 
     def equals(self, stack):
         '''
@@ -305,75 +487,223 @@ class Stack(object):
         Returns:
             bool: True if the stacks are equals
         '''
-        elems1 = self.get_elems()
-        elems2 = stack.get_elems()
-        if len(elems1) != len(elems2):
+        node1 = self._head
+        node2 = stack._head
+        if self.depth() != stack.depth():
             return False
-        for (v1, v2) in zip(elems1, elems2):
-            if not v1.equals(v2):
+        # Stop on the first shared cell
+        while node1 is not node2:
+            if node1.elem is not node2.elem and node1.elem != node2.elem:
                 return False
+            node1 = node1.next
+            node2 = node2.next
         return True
 
     def top(self):
         '''
             Return the element at the top (without pop)
         Returns:
-            AbsStackElem
+            element of the domain
         '''
-        if not self._elems:
-            self.push(None)
-        return self._elems[-1]
+        if self._head is None:
+            self.push(self._domain.unknown)
+        return self._head.elem
 
     def __str__(self):
         '''
             String representation (only first 5 items)
         '''
-        return str([str(x) for x in self._elems[-100::]])
+        elems = [self._domain.get_vals(x) for x in self.get_elems()[-100::]]
+        return str([str(set(x)) if x is not None else str(None) for x in elems])
 
 
-def merge_stack(stacks: List[Stack], authorized_values):
+def _merge_nodes(heads, domain):
+    '''
+        Merge at least two different stacks, aligned on their bottom
+    Args:
+        heads (list of _StackNode)
+        domain (AbsValueDomain)
+    Returns:
+        _StackNode
+    '''
+    depths = [node.depth if node is not None else 0 for node in heads]
+    deepest = max(range(len(heads)), key=depths.__getitem__)
+    deepest_head = heads[deepest]
+
+    # The top of the deepest stack is not merged with the other stacks
+    others_depth = max(depths[:deepest] + depths[deepest + 1:])
+    node = deepest_head
+    for _ in range(depths[deepest] - others_depth):
+        node = node.next
+    heads[deepest] = node
+    deepest_bottom = node
+
+    # Merge until the stacks share the same cells. reuse is True while the
+    # merged elements are the ones of the deepest stack
+    merged_elems = []
+    reuse = True
+    while True:
+        first = heads[0]
+        for node in heads:
+            if node is not first:
+                break
+        else:
+            break
+        deepest_node = heads[deepest]
+        level = deepest_node.depth
+        elems = []
+        for (i, node) in enumerate(heads):
+            if node is not None and node.depth == level:
+                elems.append(node.elem)
+                heads[i] = node.next
+        elem = domain.join(elems)
+        if reuse and elem is not deepest_node.elem and elem != deepest_node.elem:
+            reuse = False
+        merged_elems.append(elem)
+
+    tail = _normalize(heads[0], domain)
+    if reuse and tail is heads[0]:
+        bottom = deepest_bottom
+    else:
+        bottom = _build_nodes(reversed(merged_elems), tail)
+
+    if bottom is deepest_bottom and _is_normalized(deepest_head, domain):
+        return deepest_head
+
+    top_elems = []
+    node = deepest_head
+    while node is not deepest_bottom:
+        elem = node.elem
+        top_elems.append(elem if domain.is_normalized(elem) else domain.empty)
+        node = node.next
+    return _build_nodes(reversed(top_elems), bottom)
+
+
+def merge_stack(stacks: List[Stack], domain):
     '''
-        Merge two stack. Returns a new object
+        Merge stacks, aligned on their bottom. Returns a new object
+
+        If one of the merged values is TOP, or if there are too many values,
+        the element is empty. The merged stack has one more (empty) element
+        than the longest stack.
+
+        Only the region where the stacks differ is walked, and the cells of
+        the stacks are reused when the merge does not change them
     Arg:
-        stack (Stack)
+        stacks (list of Stack)
+        domain (AbsValueDomain)
     Returns: New object representing the merge
     '''
-
-    stack_elements: List[AbsStackElem] = []
-
-    _max_number_of_elements = len(authorized_values) if authorized_values else 100
-
-    found = True
-    i = 0
-    while found:
-        vals: Optional[Set[int]] = set()
-        found = False
-        for stack in stacks:
-            elems = stack.get_elems()
-            if len(elems) <= i:
-                continue
-            found = True
-            next_vals = elems[i].get_vals()
-            if next_vals is None:
-                vals = None
-                break
-            vals |= next_vals
-            if len(vals) > _max_number_of_elements:
-                vals = None
-                break
-        stack_elements.append(AbsStackElem(authorized_values, vals))
-        i = i + 1
-    newSt = Stack(authorized_values)
-    newSt.set_elems(stack_elements)
+    heads = []
+    for stack in stacks:
+        if all(stack._head is not head for head in heads):
+            heads.append(stack._head)
+
+    if not heads:
+        node = None
+    elif len(heads) == 1:
+        node = _normalize(heads[0], domain)
+    else:
+        node = _merge_nodes(heads, domain)
+
+    newSt = Stack(domain)
+    newSt._head = _StackNode(domain.empty, node)
     return newSt
 
-def get_valid_destination(instructions):
-    '''
-    Return the list of valid destinations
-    :param instructions:
-    :return:
+
+def _transfer_push(analysis, ins, stack, _):
+    stack.push_value(ins.operand)
+
+
+def _transfer_swap(analysis, ins, stack, n):
+    stack.swap(n)
+
+
+def _transfer_dup(analysis, ins, stack, n):
+    stack.dup(n)
+
+
+def _transfer_and(analysis, ins, stack, _):
+    v1 = stack.pop()
+    v2 = stack.pop()
+    stack.push(analysis.domain.absAnd(v1, v2))
+
+
+def _transfer_other(analysis, ins, stack, effect):
+    # For all the other opcode: remove
+    # the pop elements, and push None elements
+    (n_pop, n_push) = effect
+    for _ in range(0, n_pop):
+        stack.pop()
+    for _ in range(0, n_push):
+        stack.push_value(None)
+
+
+_TRANSFER_HANDLERS = {
+    opcodes.PUSH: _transfer_push,
+    opcodes.SWAP: _transfer_swap,
+    opcodes.DUP: _transfer_dup,
+    opcodes.AND: _transfer_and,
+    opcodes.OTHER: _transfer_other
+}
+
+# Transfer function of each opcode: (handler, argument)
+_TRANSFER_TABLE = [(_TRANSFER_HANDLERS[kind], arg) for (kind, arg) in opcodes.OPCODE_EFFECTS]
+
+
+class _Worklist(object):
+    '''Worklist of basic blocks
+
+    A basic block is present at most once. Blocks are popped by priority
+    (lowest first), and blocks without priority are popped last, by address
     '''
-    return set([ins.pc for ins in instructions if ins.name == 'JUMPDEST'])
+
+    def __init__(self):
+        self._heap = []
+        self._queued = set()
+        self._priorities = {}
+        self.pushes = 0
+
+    def __len__(self):
+        return len(self._queued)
+
+    def _priority(self, bb):
+        return self._priorities.get(bb.start_pc, len(self._priorities)), bb.start_pc
+
+    def set_priorities(self, priorities):
+        '''
+            Update the priorities, and reorder the queued blocks
+        Args:
+            priorities (dict): start pc -> priority (int)
+        '''
+        self._priorities = priorities
+        self._heap = [self._priority(bb) + (bb,) for (_, _, bb) in self._heap]
+        heapq.heapify(self._heap)
+
+    def push(self, bb):
+        '''
+            Add a basic block, if it is not already queued
+        Args:
+            bb (BasicBlock)
+        '''
+        if bb.start_pc in self._queued:
+            return
+        self._queued.add(bb.start_pc)
+        heapq.heappush(self._heap, self._priority(bb) + (bb,))
+        self.pushes += 1
+
+    def pop(self):
+        (_, start_pc, bb) = heapq.heappop(self._heap)
+        self._queued.remove(start_pc)
+        return bb
+
+    def blocks(self):
+        '''
+        Returns
+            list(BasicBlock): the queued blocks, by address
+        '''
+        return [bb for (_, _, bb) in sorted(self._heap, key=lambda item: item[1])]
+
 
 class StackValueAnalysis(object):
     '''Stack value analysis.
@@ -381,6 +711,14 @@ class StackValueAnalysis(object):
     After each convergence, we add the new branches and re-analyze the function.
     The exploration is bounded in case the analysis is lost.
 
+    The analysis stops after maxiteration re-analyses, max_steps basic block
+    analyses, or at the deadline. The CFG of the function is then partial, and
+    the basic blocks whose analysis was pending are kept in cut_off.
+
+    The basic blocks to analyze are kept in a worklist, ordered by reverse
+    postorder of the edges known so far, so that the fathers of a block are
+    (mostly) analyzed before it.
+
     IF enable_optimization is enabled, only keep track of valid destination
     '''
 
@@ -391,11 +729,15 @@ class StackValueAnalysis(object):
                  maxiteration=1000,
                  maxexploration=100,
                  initStack=None,
-                 enable_optimization=True):
+                 enable_optimization=True,
+                 max_steps=None,
+                 deadline=None):
         '''
         Args:
             maxiteration (int): number of time re-analyze the function
             maxexploration (int): number of time re-explore a bb
+            max_steps (int): number of bb analyses (None: no limit)
+            deadline (float): time.monotonic() value at which the analysis stops (None: no limit)
         '''
         # last targets discovered. We keep track of these branches to only
         # re-launch the analysis on new paths found
@@ -416,12 +758,32 @@ class StackValueAnalysis(object):
         # recursion
         self.counter = 0
 
+        # number of basic blocks analyzed, and of reverse postorder computations
+        self.bb_visits = 0
+        self.priority_updates = 0
+
+        # number of basic blocks analyzed with their summary
+        self.summaries_applied = 0
+
+        # number of stack merges, of basic blocks skipped after MAXEXPLORATION
+        # explorations, and 1 if the analysis stopped after MAXITERATION
+        self.merges = 0
+        self.maxexploration_hits = 0
+        self.maxiteration_hits = 0
+
         # limit the number of time we re-analyze a function
         self.MAXITERATION = maxiteration
 
         # limit the number of time we explore a basic block (unrool)
         self.MAXEXPLORATION = maxexploration
 
+        # limit the number of bb analyses, and the time of the analysis
+        self._max_steps = max_steps
+        self._deadline = deadline
+
+        # start pcs of the bbs not analyzed once the analysis stopped
+        self.cut_off = []
+
         self.initStack = initStack
 
         self._entry_point = entry_point
@@ -432,19 +794,63 @@ class StackValueAnalysis(object):
 
         self._basic_blocks_explored = []
 
-        self._to_explore = {self._entry_point}
-
-        self._outgoing_basic_blocks = []
+        self._worklist = _Worklist()
 
         self._authorized_values = None
 
         if enable_optimization:
-            self._authorized_values = get_valid_destination(cfg.instructions)
+            # Computed once by the CFG, and shared by all the analyses
+            self._authorized_values = cfg.jumpdests
+
+        # Shared by all the analyses of the CFG
+        self._domain = get_value_domain(cfg, enable_optimization)
+
+        # stub is only called if it is overridden
+        self._stubbed = type(self).stub is not StackValueAnalysis.stub
+
+        # The blocks are interpreted instruction per instruction if the transfer
+        # function is customized
+        self._use_summaries = (not self._stubbed and
+                               type(self)._transfer_func_ins is StackValueAnalysis._transfer_func_ins)
 
     @property
     def authorized_values(self):
         return self._authorized_values
 
+    @property
+    def domain(self):
+        return self._domain
+
+    @property
+    def counters(self):
+        '''
+            Counters of the analysis
+        Returns:
+            dict: iterations (number of time the function was re-analyzed),
+            bb_visits, summaries_applied, worklist_pushes, priority_updates,
+            merges, maxexploration_hits, maxiteration_hits and cut_off (number
+            of bbs not analyzed once the analysis stopped)
+        '''
+        return {
+            'iterations': self.counter,
+            'bb_visits': self.bb_visits,
+            'summaries_applied': self.summaries_applied,
+            'worklist_pushes': self._worklist.pushes,
+            'priority_updates': self.priority_updates,
+            'merges': self.merges,
+            'maxexploration_hits': self.maxexploration_hits,
+            'maxiteration_hits': self.maxiteration_hits,
+            'cut_off': len(self.cut_off)
+        }
+
+    @property
+    def incomplete(self):
+        '''
+        Returns
+            bool: True if the analysis stopped before convergence
+        '''
+        return bool(self.cut_off)
+
     def is_jumpdst(self, addr):
         '''
             Check that an instruction is a JUMPDEST
@@ -456,46 +862,20 @@ class StackValueAnalysis(object):
         Returns:
             bool: True if the instruction is a JUMPDEST
         '''
-        ins = self.cfg.get_instruction_at(addr)
-        if ins is None:
-            return False
-
-        return ins.name == 'JUMPDEST'
+        return self.cfg.is_jumpdest(addr)
 
     def stub(self, ins, addr, stack):
         return (False, None)
 
     def _transfer_func_ins(self, ins, addr, stack):
 
-        (is_stub, stub_ret) = self.stub(ins, addr, stack)
-        if is_stub:
-            return stub_ret
-
-        op = ins.name
-        if op.startswith('PUSH'):
-            stack.push(ins.operand)
-
-        elif op.startswith('SWAP'):
-            nth_elem = int(op[4:])
-            stack.swap(nth_elem)
-        elif op.startswith('DUP'):
-            nth_elem = int(op[3:])
-            stack.dup(nth_elem)
-        elif op == 'AND':
-            v1 = stack.pop()
-            v2 = stack.pop()
-            stack.push(v1.absAnd(v2))
-        # For all the other opcode: remove
-        # the pop elements, and push None elements
-        # if JUMP or JUMPI saves the last value before poping
-        else:
-            n_pop = ins.pops
-            n_push = ins.pushes
-            for _ in range(0, n_pop):
-                stack.pop()
-            for _ in range(0, n_push):
-                stack.push(None)
+        if self._stubbed:
+            (is_stub, stub_ret) = self.stub(ins, addr, stack)
+            if is_stub:
+                return stub_ret
 
+        (handler, arg) = _TRANSFER_TABLE[ins.opcode]
+        handler(self, ins, stack, arg)
         return stack
 
     def _explore_bb(self, bb, stack):
@@ -512,27 +892,41 @@ class StackValueAnalysis(object):
             bb
             stack (Stack)
         Returns:
-            AbsStackElem: last jump computed.
+            element of the domain: last jump computed.
         '''
         last_jump = None
 
-        if not bb.start.pc in self._basic_blocks_explored:
-            self._basic_blocks_explored.append(bb.start.pc)
+        if not bb.start_pc in self._basic_blocks_explored:
+            self._basic_blocks_explored.append(bb.start_pc)
+
+        # Apply the stack effect of the whole block, if the stack is deep enough
+        if self._use_summaries:
+            summary = get_block_summary(self.cfg, bb)
+            (applied, jump_target) = stack.apply_summary(summary)
+            if applied:
+                end = bb.end_pc
+                if summary.jump_target is not None:
+                    self.last_ins_top_value[end] = self._domain.get_vals(jump_target)
+                    last_jump = stack.top()
+                self.stacksOut[end] = stack
+                self.summaries_applied += 1
+                return last_jump
 
         ins = None
-        for idx, ins in enumerate(bb.instructions):
+        instructions = bb.instructions
+        for idx, ins in enumerate(instructions):
             addr = ins.pc
             # Only save last instructions
-            if idx == len(bb.instructions) - 1 and ins.name in ["JUMP", "JUMPI"]:
-                self.last_ins_top_value[addr] = stack.top().get_vals()
+            if idx == len(instructions) - 1 and ins.name in ["JUMP", "JUMPI"]:
+                self.last_ins_top_value[addr] = self._domain.get_vals(stack.top())
                 # stackIn = stack
-                # stack = Stack(self.authorized_values)
+                # stack = Stack(self._domain)
                 # stack.copy_stack(stackIn)
 
             stack = self._transfer_func_ins(ins, addr, stack)
 
             # Only save stackOut for last instructions
-            if idx == len(bb.instructions) - 1:
+            if idx == len(instructions) - 1:
                 self.stacksOut[addr] = stack
 
         if ins:
@@ -550,9 +944,9 @@ class StackValueAnalysis(object):
 
         if self._key == Function.DISPATCHER_ID and bb.reacheable:
             return
-        addr = bb.start.pc
-        end_ins = bb.end
-        end = end_ins.pc
+        self.bb_visits += 1
+        addr = bb.start_pc
+        end = bb.end_pc
 
         # bound the number of times we analyze a BB
         if addr not in self.bb_counter:
@@ -562,6 +956,7 @@ class StackValueAnalysis(object):
 
             if self.bb_counter[addr] > self.MAXEXPLORATION:
                 # print('Reach max explo {}'.format(hex(addr)))
+                self.maxexploration_hits += 1
                 return
 
         # Check if the bb was already analyzed (used for convergence)
@@ -574,22 +969,23 @@ class StackValueAnalysis(object):
         if init and self.initStack:
             stack = self.initStack
         else:
-            stack = Stack(self.authorized_values)
+            stack = Stack(self._domain)
 
         # Merge all the stack incoming_basic_blocks
         # We merge only father that were already analyzed
         incoming_basic_blocks = bb.incoming_basic_blocks(self._key)
 
-        incoming_basic_blocks = [f for f in incoming_basic_blocks if f.end.pc in self.stacksOut]
+        incoming_basic_blocks = [f for f in incoming_basic_blocks if f.end_pc in self.stacksOut]
 
         if incoming_basic_blocks:
-            stacks = [self.stacksOut[father.end.pc] for father in incoming_basic_blocks]
-            stack = merge_stack(stacks, self._authorized_values,)
+            stacks = [self.stacksOut[father.end_pc] for father in incoming_basic_blocks]
+            stack = merge_stack(stacks, self._domain)
+            self.merges += 1
         # Analyze the BB
         self._explore_bb(bb, stack)
 
         # check if the last instruction is a JUMP
-        op = end_ins.name
+        op = bb.end_name
 
         if op == 'JUMP':
             src = end
@@ -618,8 +1014,8 @@ class StackValueAnalysis(object):
                 converged = True
 
         if not converged:
-            new_outgoing_basic_blocks = bb.outgoing_basic_blocks(self._key)
-            self._outgoing_basic_blocks = new_outgoing_basic_blocks + self._outgoing_basic_blocks
+            for son in bb.outgoing_basic_blocks(self._key):
+                self._worklist.push(son)
 
     def add_branches(self, src, dst):
         '''
@@ -640,21 +1036,47 @@ class StackValueAnalysis(object):
 
                 self.all_discovered_targets[src].add(d)
 
+    def _update_priorities(self):
+        '''
+            Compute the reverse postorder of the basic blocks reached from the
+            entry point, and use it as priority in the worklist
+        '''
+        key = self._key
+        postorder = []
+        visited = {self._entry_point.start_pc}
+        # Iterative DFS: (bb, iterator over the sons)
+        to_explore = [(self._entry_point, iter(self._entry_point.outgoing_basic_blocks(key)))]
+        while to_explore:
+            (bb, sons) = to_explore[-1]
+            for son in sons:
+                if son.start_pc not in visited:
+                    visited.add(son.start_pc)
+                    to_explore.append((son, iter(son.outgoing_basic_blocks(key))))
+                    break
+            else:
+                to_explore.pop()
+                postorder.append(bb.start_pc)
+
+        n = len(postorder)
+        self._worklist.set_priorities({start_pc: n - idx for (idx, start_pc) in enumerate(postorder)})
+        self.priority_updates += 1
+
     def explore(self):
         """
-            Launch the analysis
+            Analyze the basic blocks of the worklist until convergence, then
+            add the new branches discovered, and their destinations to the worklist
         """
-        init = False
-
-        bb = self._to_explore.pop()
+        self.counter += 1
 
-        self._transfer_func_bb(bb, init)
-        while self._outgoing_basic_blocks:
-            self._transfer_func_bb(self._outgoing_basic_blocks.pop())
+        while self._worklist and not self._out_of_budget():
+            self._transfer_func_bb(self._worklist.pop())
 
         last_discovered_targets = self.last_discovered_targets
         self.last_discovered_targets = {}
 
+        if not last_discovered_targets:
+            return
+
         for src, dsts in last_discovered_targets.items():
             bb_from = self.cfg.get_basic_block_at(src)
             for dst in dsts:
@@ -663,19 +1085,32 @@ class StackValueAnalysis(object):
                 bb_from.add_outgoing_basic_block(bb_to, self._key)
                 bb_to.add_incoming_basic_block(bb_from, self._key)
 
-        dsts = [dests for (src, dests) in last_discovered_targets.items()]
-        self._to_explore |= {
-            self.cfg.get_basic_block_at(item)
-            for sublist in dsts
-            for item in sublist
-        }
+        # New edges can change the order of the blocks
+        self._update_priorities()
+        for dsts in last_discovered_targets.values():
+            for dst in dsts:
+                self._worklist.push(self.cfg.get_basic_block_at(dst))
 
+    def _out_of_budget(self):
+        if self._max_steps is not None and self.bb_visits >= self._max_steps:
+            return True
+        return self._deadline is not None and time.monotonic() >= self._deadline
 
     def analyze(self):
         self.cfg.compute_simple_edges(self._key)
-        while self._to_explore:
+
+        self._update_priorities()
+        self._worklist.push(self._entry_point)
+        while self._worklist:
+            if self.counter >= self.MAXITERATION:
+                self.maxiteration_hits = 1
+                break
+            if self._out_of_budget():
+                break
             self.explore()
 
+        self.cut_off = [bb.start_pc for bb in self._worklist.blocks()]
+
         self.cfg.compute_reachability(self._entry_point, self._key)
 
         return self._basic_blocks_explored
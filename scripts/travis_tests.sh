@@ -35,3 +35,14 @@ do
         exit -1
     fi
 done
+
+for t in tests/test_*.py
+do
+    python $t > /dev/null 2>&1
+    if [ $? -ne 0 ]
+    then
+        echo "$t failed"
+        python $t
+        exit -1
+    fi
+done
@@ -7,6 +7,7 @@ setup(
     author='Trail of Bits',
     version='0.3.1',
     packages=find_packages(),
+    package_data={'evm_cfg_builder': ['known_hashes/known_hashes.db']},
     python_requires='>=3.6',
     install_requires=['pyevmasm>=0.1.1', 'crytic-compile>=0.1.13'],
     license='AGPL-3.0',
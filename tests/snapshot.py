@@ -0,0 +1,59 @@
+'''
+    Helpers shared by the tests: the bundled contracts, and a comparable view
+    of a CFG, used to check that two CFGs are the same
+'''
+import logging
+import os
+from contextlib import contextmanager
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(TESTS, '..')
+
+CONTRACTS = [os.path.join(TESTS, 'fomo3d.evm'),
+             os.path.join(TESTS, 'recurse.evm'),
+             os.path.join(ROOT, 'examples', 'token-runtime.evm')]
+
+
+def read_contract(path):
+    with open(path) as f:
+        return f.read()
+
+
+@contextmanager
+def quiet():
+    '''
+        Hide the logs of the analysis (ex: the functions cut off)
+    '''
+    logger = logging.getLogger('evm-cfg-builder')
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def snapshot(cfg):
+    '''
+        Return the basic blocks, and the functions with their CFG
+    Args:
+        cfg (CFG)
+    Returns:
+        list
+    '''
+    result = [cfg.bytecode, cfg.optimization_enabled]
+    for bb in cfg.basic_blocks:
+        result.append([(ins.pc, ins.name) for ins in bb.instructions])
+    for function in sorted(cfg.functions, key=lambda f: f.start_addr):
+        key = function.key
+        result.append((function.name,
+                       function.hash_id,
+                       function.start_addr,
+                       sorted(function.attributes),
+                       sorted(bb.start_pc for bb in function.cut_off_blocks)))
+        for bb in sorted(function.basic_blocks, key=lambda bb: bb.start_pc):
+            result.append((bb.start_pc,
+                           sorted(son.start_pc for son in bb.outgoing_basic_blocks(key)),
+                           sorted(father.start_pc for father in bb.incoming_basic_blocks(key)),
+                           key in bb.reacheable))
+    return result
@@ -0,0 +1,119 @@
+'''
+    Options of the value analysis: optimization_enabled, MAXITERATION, and
+    the --disable-optimizations flag
+
+    Before the fix, CFG passed optimization_enabled positionally into
+    maxiteration, so the analysis always ran with the optimization, the
+    iterations were limited to 0 or 1 (and this limit was not enforced), and
+    the CLI inverted --disable-optimizations.
+
+    Usage: python tests/test_analysis_options.py
+'''
+import os
+
+import evm_cfg_builder.__main__ as cli
+import evm_cfg_builder.cfg as cfg_module
+from evm_cfg_builder.cfg import CFG
+from evm_cfg_builder.value_analysis.value_set_analysis import StackValueAnalysis
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+FOMO3D = os.path.join(TESTS, 'fomo3d.evm')
+
+
+def _bytecode():
+    with open(FOMO3D) as f:
+        return f.read()
+
+
+class _RecordingAnalysis(StackValueAnalysis):
+    analyses = []
+
+    def __init__(self, *args, **kwargs):
+        super(_RecordingAnalysis, self).__init__(*args, **kwargs)
+        _RecordingAnalysis.analyses.append(self)
+
+
+def _analyses(optimization_enabled):
+    _RecordingAnalysis.analyses = []
+    cfg_module.StackValueAnalysis = _RecordingAnalysis
+    try:
+        CFG(_bytecode(), optimization_enabled=optimization_enabled)
+    finally:
+        cfg_module.StackValueAnalysis = StackValueAnalysis
+    return _RecordingAnalysis.analyses
+
+
+def test_optimization_enabled():
+    analyses = _analyses(True)
+    assert analyses
+    for vsa in analyses:
+        assert vsa.authorized_values
+        assert vsa.MAXITERATION == 1000
+
+
+def test_optimization_disabled():
+    # Before: the jumpdests were still used, and MAXITERATION was 0
+    analyses = _analyses(False)
+    assert analyses
+    for vsa in analyses:
+        assert vsa.authorized_values is None
+        assert vsa.MAXITERATION == 1000
+
+
+def test_same_cfg_without_optimization():
+    with_optimization = CFG(_bytecode())
+    without_optimization = CFG(_bytecode(), optimization_enabled=False)
+    assert len(with_optimization.functions) == len(without_optimization.functions)
+    for function in with_optimization.functions:
+        other = without_optimization.get_function_at(function.start_addr)
+        assert sorted(bb.start_pc for bb in function.basic_blocks) == \
+            sorted(bb.start_pc for bb in other.basic_blocks)
+
+
+def test_maxiteration_counters():
+    # Before: maxiteration_hits counted the iterations after the first one
+    cfg = CFG(_bytecode())
+    for function in cfg.stats.to_dict()['functions']:
+        assert function['iterations'] > 0
+        assert function['maxiteration_hits'] == 0
+
+
+def test_maxiteration_enforced():
+    # Before: the analysis went on after MAXITERATION
+    cfg = CFG(_bytecode(), compute_cfgs=False)
+    function = next(f for f in cfg.functions if f.name == 'setName(string)')
+    vsa = StackValueAnalysis(cfg, function.entry, function.hash_id, maxiteration=2)
+    vsa.analyze()
+    assert vsa.counter == 2
+    assert vsa.maxiteration_hits == 1
+    assert vsa.incomplete
+
+
+def _cli_optimization_enabled(argv):
+    calls = []
+
+    def recording_cfg(*args, **kwargs):
+        calls.append(kwargs['optimization_enabled'])
+        return CFG(*args, **kwargs)
+
+    args = cli.parse_args([FOMO3D, '--export-dot', ''] + argv)
+    cli.CFG = recording_cfg
+    try:
+        cli._run(_bytecode(), FOMO3D, args, None)
+    finally:
+        cli.CFG = CFG
+    assert len(calls) == 1
+    return calls[0]
+
+
+def test_cli_disable_optimizations():
+    # Before: the flag was inverted
+    assert _cli_optimization_enabled([]) is True
+    assert _cli_optimization_enabled(['--disable-optimizations']) is False
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
@@ -0,0 +1,81 @@
+'''
+    Basic blocks, with and without instruction table
+
+    Usage: python tests/test_basic_block.py
+'''
+from pyevmasm import disassemble_all
+
+from evm_cfg_builder.cfg import CFG, BasicBlock
+
+from snapshot import CONTRACTS, read_contract
+
+
+def _standalone(hex_bytecode):
+    bb = BasicBlock()
+    for ins in disassemble_all(bytes.fromhex(hex_bytecode)):
+        bb.add_instruction(ins)
+    return bb
+
+
+def test_add_instruction():
+    # JUMPDEST PUSH1 0x01 JUMPI
+    bb = _standalone('5b600157')
+    assert (bb.start.name, bb.end.name) == ('JUMPDEST', 'JUMPI')
+    assert (bb.start_pc, bb.end_pc, bb.end_name) == (0, 3, 'JUMPI')
+    assert [ins.pc for ins in bb.instructions] == [0, 1, 3]
+    assert bb.ends_with_jump_or_jumpi()
+    assert bb.id is None
+
+
+def test_standalone_edges():
+    bb = _standalone('5b600157')
+    sons = [_standalone('5b'), _standalone('5b00')]
+    father = _standalone('5b')
+    for son in sons:
+        bb.add_outgoing_basic_block(son, 1)
+        son.add_incoming_basic_block(bb, 1)
+    bb.add_outgoing_basic_block(sons[0], 1)
+    bb.add_outgoing_basic_block(sons[1], 2)
+    bb.add_incoming_basic_block(father, 2)
+
+    assert bb.outgoing_basic_blocks(1) == sons
+    assert bb.outgoing_basic_blocks(2) == [sons[1]]
+    assert bb.outgoing_basic_blocks(3) == []
+    assert bb.all_outgoing_basic_blocks == sons
+    assert bb.outgoing_basic_blocks_as_dict == {1: sons, 2: [sons[1]]}
+    assert bb.incoming_basic_blocks(2) == [father]
+    assert bb.all_incoming_basic_blocks == [father]
+    for son in sons:
+        assert son.incoming_basic_blocks(1) == [bb]
+        assert son.all_incoming_basic_blocks == [bb]
+        assert son.all_outgoing_basic_blocks == []
+
+    bb.set_outgoing_basic_blocks(1, [sons[1]])
+    assert bb.outgoing_basic_blocks(1) == [sons[1]]
+    bb.remove_basic_blocks(2)
+    assert bb.all_outgoing_basic_blocks == [sons[1]]
+    assert bb.all_incoming_basic_blocks == []
+
+
+def test_instruction_table():
+    cfg = CFG(read_contract(CONTRACTS[0]), compute_cfgs=False)
+    for bb in cfg.basic_blocks:
+        instructions = bb.instructions
+        # The instructions are created once
+        assert bb.start is instructions[0]
+        assert bb.end is instructions[-1]
+        assert bb.instructions == instructions
+        assert bb.instructions is not instructions
+        assert (bb.start_pc, bb.end_pc, bb.end_name) == (bb.start.pc, bb.end.pc, bb.end.name)
+        try:
+            bb.add_instruction(bb.start)
+        except AssertionError:
+            continue
+        assert False
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
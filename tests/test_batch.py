@@ -0,0 +1,95 @@
+'''
+    Batch mode: the results with worker processes are the same as the serial ones
+
+    Usage: python tests/test_batch.py
+'''
+import json
+import os
+import tempfile
+
+import evm_cfg_builder.__main__ as cli
+from evm_cfg_builder.batch import NO_CONTRACT_FOUND, analyze_many
+
+from snapshot import CONTRACTS, quiet, read_contract
+
+WORKERS = 2
+
+
+def _results(sources, **options):
+    '''
+        Return the results, without their time, sorted (the workers complete in any order)
+    '''
+    results = []
+    for result in analyze_many(sources, **options):
+        del result['time']
+        results.append(result)
+    return sorted(results, key=lambda result: json.dumps(result, sort_keys=True))
+
+
+def _write_jsonl(directory):
+    path = os.path.join(directory, 'contracts.jsonl')
+    with open(path, 'w') as f:
+        for (idx, contract) in enumerate(CONTRACTS):
+            f.write(json.dumps({'address': hex(idx), 'bytecode': read_contract(contract)}) + '\n')
+        f.write('\n')
+        f.write(json.dumps({'address': 'invalid', 'bytecode': '0xzz'}) + '\n')
+    return path
+
+
+def test_jobs():
+    with tempfile.TemporaryDirectory() as directory:
+        sources = CONTRACTS + [_write_jsonl(directory)]
+        serial = _results(sources, workers=1)
+        assert len(serial) == 2 * len(CONTRACTS) + 1
+        assert _results(sources, workers=WORKERS) == serial
+
+
+def test_results():
+    with tempfile.TemporaryDirectory() as directory:
+        results = _results([_write_jsonl(directory)], workers=1)
+    by_address = {result['address']: result for result in results}
+    assert 'error' in by_address['invalid']
+    fomo3d = by_address['0x0']
+    assert 'error' not in fomo3d
+    assert any(function['signature'] == 'transfer(address,uint256)' for function in fomo3d['functions'])
+
+
+def test_invalid_records():
+    # One error per invalid line, the other contracts are analyzed
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'contracts.jsonl')
+        with open(path, 'w') as f:
+            f.write('{"address": "0x0", "bytecode": \n')
+            f.write(json.dumps({'address': '0x1'}) + '\n')
+            f.write('[]\n')
+            f.write(json.dumps({'address': '0x2', 'bytecode': read_contract(CONTRACTS[1])}) + '\n')
+        results = _results([path], workers=WORKERS)
+    errors = [result for result in results if 'line' in result]
+    assert sorted(result['line'] for result in errors) == [1, 2, 3]
+    assert all(result['source'] == path and 'error' in result for result in errors)
+    (recurse,) = [result for result in results if result.get('address') == '0x2']
+    assert 'error' not in recurse
+
+
+def test_no_contract_found():
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        missing = os.path.join(directory, '*.evm')
+        results = _results([missing, CONTRACTS[1]], workers=1)
+        assert {'source': missing, 'error': NO_CONTRACT_FOUND} in results
+        assert len(results) == 2
+
+        output = os.path.join(directory, 'results.jsonl')
+        try:
+            cli.main_batch([missing, CONTRACTS[1], '--output', output])
+        except SystemExit as e:
+            assert e.code == 1
+        else:
+            assert False
+        cli.main_batch([CONTRACTS[1], '--output', output])
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
@@ -0,0 +1,109 @@
+'''
+    Analysis budgets: the analysis stops, and the partial CFGs are flagged
+
+    Usage: python tests/test_budget.py
+'''
+from evm_cfg_builder.batch import analyze_many
+from evm_cfg_builder.cfg import CFG, AnalysisBudget
+
+from snapshot import CONTRACTS, quiet, read_contract, snapshot
+
+FOMO3D = CONTRACTS[0]
+
+
+def _bb_visits(cfg):
+    return sum(function['bb_visits'] for function in cfg.stats.to_dict()['functions'])
+
+
+def test_no_limit_reached():
+    bytecode = read_contract(FOMO3D)
+    budget = AnalysisBudget(max_time=3600, max_steps=10**6, function_max_time=3600, function_max_steps=10**6)
+    cfg = CFG(bytecode, budget=budget)
+    assert not cfg.incomplete
+    assert not any(function.incomplete for function in cfg.functions)
+    assert snapshot(cfg) == snapshot(CFG(bytecode))
+
+
+def test_function_max_steps():
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), budget=AnalysisBudget(function_max_steps=1))
+    assert cfg.incomplete
+    for function in cfg.functions:
+        assert function.incomplete
+        assert function.cut_off_blocks
+        assert 'view' not in function.attributes
+        assert 'pure' not in function.attributes
+    for counters in cfg.stats.to_dict()['functions']:
+        assert counters['bb_visits'] == 1
+        assert counters['cut_off'] > 0
+
+
+def test_max_steps():
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), budget=AnalysisBudget(max_steps=50))
+    assert cfg.incomplete
+    assert _bb_visits(cfg) <= 50
+    # The first functions are complete, the others are not explored
+    assert not cfg.functions[0].incomplete
+    assert cfg.functions[-1].incomplete
+
+
+def test_max_steps_workers():
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), workers=2, budget=AnalysisBudget(max_steps=50))
+    assert cfg.incomplete
+    assert _bb_visits(cfg) <= 50
+
+
+def test_max_steps_workers_fewer_steps_than_functions():
+    # The first functions get the steps, the total stays in the budget
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), workers=2, budget=AnalysisBudget(max_steps=5))
+    assert len(cfg.functions) > 5
+    assert cfg.incomplete
+    assert _bb_visits(cfg) <= 5
+    # Without the dispatcher, analyzed after the workers
+    visits = [function['bb_visits'] for function in cfg.stats.to_dict()['functions']
+              if function['name'] != '_dispatcher']
+    assert visits[:5] == [1] * 5
+    assert not any(visits[5:])
+
+
+def test_max_time():
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), budget=AnalysisBudget(max_time=0))
+    assert cfg.incomplete
+    assert _bb_visits(cfg) == 0
+
+
+def test_lazy_analysis():
+    # The contract budget covers the functions analyzed later
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), compute_cfgs=False, budget=AnalysisBudget(max_steps=50))
+        for function in cfg.functions:
+            function.basic_blocks
+    assert cfg.incomplete
+    assert _bb_visits(cfg) <= 50
+
+
+def test_serialization():
+    with quiet():
+        cfg = CFG(read_contract(FOMO3D), budget=AnalysisBudget(function_max_steps=3))
+    loaded = CFG.loads(cfg.dumps())
+    assert loaded.incomplete
+    assert snapshot(loaded) == snapshot(cfg)
+
+
+def test_batch():
+    with quiet():
+        (result,) = analyze_many([FOMO3D], workers=1, budget=AnalysisBudget(function_max_steps=1))
+    assert 'error' not in result
+    assert len(result['incomplete']) == len(result['functions'])
+    assert all(function['cut_off'] for function in result['incomplete'])
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
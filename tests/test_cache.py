@@ -0,0 +1,143 @@
+'''
+    On-disk cache of the CFGs: hits, invalid entries and eviction
+
+    Usage: python tests/test_cache.py
+'''
+import os
+import tempfile
+
+from evm_cfg_builder.cfg import CFG, AnalysisBudget, convert_bytecode
+from evm_cfg_builder.cfg.cache import CFGCache
+
+from snapshot import CONTRACTS, quiet, read_contract, snapshot
+
+
+class _CountingCache(CFGCache):
+
+    def __init__(self, directory, max_size=None):
+        super(_CountingCache, self).__init__(directory, max_size)
+        self.hits = 0
+        self.puts = 0
+        self.scans = 0
+
+    def get(self, key):
+        entry = super(_CountingCache, self).get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.puts += 1
+        super(_CountingCache, self).put(key, entry)
+
+    def _entries(self):
+        self.scans += 1
+        return super(_CountingCache, self)._entries()
+
+
+def _entry_paths(directory):
+    return [os.path.join(root, filename)
+            for (root, _, files) in os.walk(directory)
+            for filename in files if filename.endswith('.cfg')]
+
+
+def test_hit():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = _CountingCache(directory)
+        for path in CONTRACTS:
+            bytecode = read_contract(path)
+            expected = snapshot(CFG(bytecode))
+
+            cfg = CFG.from_cache(bytecode, cache)
+            assert (cache.hits, cache.puts) == (0, 1)
+            assert snapshot(cfg) == expected
+
+            cfg = CFG.from_cache(bytecode, cache)
+            assert (cache.hits, cache.puts) == (1, 1)
+            assert snapshot(cfg) == expected
+
+            # The options are part of the key
+            CFG.from_cache(bytecode, cache, optimization_enabled=False)
+            assert (cache.hits, cache.puts) == (1, 2)
+
+            cache.hits = cache.puts = 0
+
+
+def test_invalid_entry():
+    bytecode = read_contract(CONTRACTS[0])
+    expected = snapshot(CFG(bytecode))
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        cache = _CountingCache(directory)
+        CFG.from_cache(bytecode, cache)
+        (path,) = _entry_paths(directory)
+        valid = open(path, 'rb').read()
+
+        for invalid in [b'', b'garbage', valid[:len(valid) // 2], valid[:-1] + b'\x00']:
+            with open(path, 'wb') as f:
+                f.write(invalid)
+            cache.hits = cache.puts = 0
+            # The entry is recomputed, and replaced
+            assert snapshot(CFG.from_cache(bytecode, cache)) == expected
+            assert (cache.hits, cache.puts) == (1, 1)
+            assert open(path, 'rb').read() == valid
+
+
+def test_incomplete_not_cached():
+    bytecode = read_contract(CONTRACTS[0])
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        cache = _CountingCache(directory)
+        cfg = CFG.from_cache(bytecode, cache, budget=AnalysisBudget(function_max_steps=1))
+        assert cfg.incomplete
+        assert cache.puts == 0
+        assert _entry_paths(directory) == []
+
+
+def test_key():
+    bytecode = convert_bytecode(read_contract(CONTRACTS[0]))
+    key = CFGCache.key(bytecode, optimization_enabled=True)
+    assert key == CFGCache.key(bytecode, optimization_enabled=True)
+    assert key != CFGCache.key(bytecode, optimization_enabled=False)
+    assert key != CFGCache.key(bytecode + b'\x00', optimization_enabled=True)
+
+
+def test_remove():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CFGCache(directory)
+        cache.put('aa', b'entry')
+        assert cache.get('aa') == b'entry'
+        cache.remove('aa')
+        assert cache.get('aa') is None
+        cache.remove('aa')
+
+
+def test_size_tracking():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = _CountingCache(directory, max_size=10**6)
+        for idx in range(100):
+            cache.put('{:064x}'.format(idx % 50), b'x' * (idx + 1))
+        # The directory is only scanned on the first put
+        assert cache.scans == 1
+        assert cache._size == cache.size()
+
+
+def test_eviction():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = _CountingCache(directory, max_size=10000)
+        keys = ['{:064x}'.format(idx) for idx in range(200)]
+        for (idx, key) in enumerate(keys):
+            cache.put(key, b'x' * 100)
+            # Keep the first entry in use
+            os.utime(cache._path(keys[0]), (idx + 2, idx + 2))
+            os.utime(cache._path(key), (idx + 1, idx + 1))
+            assert sum(os.path.getsize(path) for path in _entry_paths(directory)) <= 10000
+        # An eviction frees room for 10 puts
+        assert cache.scans <= len(keys) // 10 + 1
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[-1]) is not None
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
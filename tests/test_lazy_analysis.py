@@ -0,0 +1,101 @@
+'''
+    Lazy analysis of the functions: the CFGs computed on demand are the same
+    as the ones of the eager analysis
+
+    Usage: python tests/test_lazy_analysis.py
+'''
+import os
+import tempfile
+
+import evm_cfg_builder.__main__ as cli
+from evm_cfg_builder.cfg import CFG
+from evm_cfg_builder.cfg.function import Function
+
+from snapshot import CONTRACTS, quiet, read_contract, snapshot
+
+
+def test_on_access():
+    for path in CONTRACTS:
+        bytecode = read_contract(path)
+        cfg = CFG(bytecode, compute_cfgs=False)
+        assert not any(function.analyzed for function in cfg.functions)
+        # In reverse order, so that the functions are not analyzed in the eager order
+        for function in reversed(cfg.functions):
+            assert function.basic_blocks
+            assert function.analyzed
+        assert snapshot(cfg) == snapshot(CFG(bytecode)), path
+
+
+def test_analyze_functions():
+    bytecode = read_contract(CONTRACTS[0])
+    eager = CFG(bytecode)
+    cfg = CFG(bytecode, compute_cfgs=False)
+
+    transfer = next(f for f in cfg.functions if f.name == 'transfer(address,uint256)')
+    selected = cfg.analyze_functions(['transfer(address,uint256)', 0x70a08231])
+    assert [f.name for f in selected] == ['transfer(address,uint256)', 'balanceOf(address)']
+    assert sorted(f.name for f in cfg.functions if f.analyzed) == ['balanceOf(address)',
+                                                                   'transfer(address,uint256)']
+
+    # Analyzed once
+    basic_blocks = transfer.basic_blocks
+    cfg.analyze_functions([transfer])
+    assert transfer.basic_blocks == basic_blocks
+
+    cfg.analyze_functions()
+    assert all(function.analyzed for function in cfg.functions)
+    assert snapshot(cfg) == snapshot(eager)
+
+
+def test_dispatcher_last():
+    bytecode = read_contract(CONTRACTS[0])
+    cfg = CFG(bytecode, compute_cfgs=False)
+    # The dispatcher depends on the other functions
+    cfg.analyze_functions([Function.DISPATCHER_ID])
+    assert all(function.analyzed for function in cfg.functions)
+    assert snapshot(cfg) == snapshot(CFG(bytecode))
+
+
+def test_unknown_function():
+    cfg = CFG(read_contract(CONTRACTS[0]), compute_cfgs=False)
+    try:
+        cfg.analyze_functions(['unknown()'])
+    except ValueError:
+        return
+    assert False
+
+
+def _dot_nodes(directory, name):
+    with open(os.path.join(directory, 'out_{}.dot'.format(name))) as f:
+        return [line for line in f if '[label=' in line]
+
+
+def test_output_to_dot():
+    # The export shows the CFG computed so far, without analyzing the function
+    cfg = CFG(read_contract(CONTRACTS[0]), compute_cfgs=False)
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        base_filename = os.path.join(directory, 'out_')
+        for function in cfg.functions:
+            function.output_to_dot(base_filename)
+        assert not any(function.analyzed for function in cfg.functions)
+        assert _dot_nodes(directory, 'transfer(address,uint256)') == []
+
+        cfg.analyze_functions(['transfer(address,uint256)'])
+        transfer = next(f for f in cfg.functions if f.name == 'transfer(address,uint256)')
+        transfer.output_to_dot(base_filename)
+        assert len(_dot_nodes(directory, 'transfer(address,uint256)')) == len(transfer.basic_blocks)
+
+
+def test_cli_disable_cfg():
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        args = cli.parse_args([CONTRACTS[0], '--disable-cfg', '--export-dot', directory])
+        cfg = cli._run(read_contract(CONTRACTS[0]), CONTRACTS[0], args, None)
+    assert not any(function.analyzed for function in cfg.functions)
+    assert 'analyze_functions' not in cfg.stats.to_dict()['phases']
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
@@ -0,0 +1,57 @@
+'''
+    Parallel CFG recovery: the CFGs computed by worker processes are the same
+    as the serial ones
+
+    Usage: python tests/test_parallel.py
+'''
+import os
+import tempfile
+
+import evm_cfg_builder.__main__ as cli
+from evm_cfg_builder.cfg import CFG
+
+from snapshot import CONTRACTS, quiet, read_contract, snapshot
+
+WORKERS = 2
+
+
+def test_workers():
+    for path in CONTRACTS:
+        bytecode = read_contract(path)
+        assert snapshot(CFG(bytecode, workers=WORKERS)) == snapshot(CFG(bytecode)), path
+
+
+def test_workers_lazy():
+    for path in CONTRACTS:
+        bytecode = read_contract(path)
+        cfg = CFG(bytecode, compute_cfgs=False, workers=WORKERS)
+        cfg.analyze_functions()
+        assert snapshot(cfg) == snapshot(CFG(bytecode)), path
+
+
+def _export_dot(path, argv):
+    '''
+        Run the CLI, and return the content of the dot files
+    '''
+    with tempfile.TemporaryDirectory() as directory, quiet():
+        args = cli.parse_args([path, '--export-dot', directory] + argv)
+        cli._run(read_contract(path), path, args, None)
+        files = {}
+        for filename in os.listdir(directory):
+            with open(os.path.join(directory, filename)) as f:
+                files[filename] = f.read()
+    return files
+
+
+def test_cli_jobs():
+    for path in CONTRACTS:
+        serial = _export_dot(path, [])
+        assert serial
+        assert _export_dot(path, ['--jobs', str(WORKERS)]) == serial, path
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
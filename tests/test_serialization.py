@@ -0,0 +1,107 @@
+'''
+    Binary serialization of the CFGs: round-trip and corrupted data
+
+    Usage: python tests/test_serialization.py
+'''
+import io
+import os
+import random
+import tempfile
+import zlib
+
+from evm_cfg_builder.cfg import CFG
+from evm_cfg_builder.cfg.serialization import MAGIC, SerializationError
+
+from snapshot import CONTRACTS, read_contract, snapshot
+
+# Offset of the checksum, after the magic and the version (one byte varint)
+CHECKSUM_START = len(MAGIC) + 1
+CHECKSUM_END = CHECKSUM_START + 4
+
+
+def _with_checksum(data):
+    '''
+        Recompute the checksum, so that the corruption is only caught by the
+        validation of the content
+    '''
+    payload = data[CHECKSUM_END:]
+    return data[:CHECKSUM_START] + zlib.crc32(payload).to_bytes(4, 'big') + payload
+
+
+def test_round_trip():
+    for path in CONTRACTS:
+        for optimization_enabled in [True, False]:
+            cfg = CFG(read_contract(path), optimization_enabled=optimization_enabled)
+            data = cfg.dumps()
+            loaded = CFG.loads(data)
+            assert snapshot(loaded) == snapshot(cfg), path
+            assert loaded.dumps() == data
+
+
+def test_lazy_round_trip():
+    # The functions are analyzed by dumps, with their attributes
+    for path in CONTRACTS:
+        cfg = CFG(read_contract(path), compute_cfgs=False)
+        loaded = CFG.loads(cfg.dumps())
+        eager = CFG(read_contract(path))
+        assert [f.attributes for f in loaded.functions] == [f.attributes for f in eager.functions], path
+        assert snapshot(loaded) == snapshot(eager), path
+
+
+def test_file_round_trip():
+    cfg = CFG(read_contract(CONTRACTS[0]))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fomo3d.cfg')
+        with open(path, 'wb') as f:
+            cfg.dump(f)
+        # Regular files are memory-mapped
+        with open(path, 'rb') as f:
+            assert snapshot(CFG.load(f)) == snapshot(cfg)
+    assert snapshot(CFG.load(io.BytesIO(cfg.dumps()))) == snapshot(cfg)
+
+
+def test_not_a_cfg():
+    for data in [b'', b'EVM', b'not a serialized CFG']:
+        try:
+            CFG.loads(data)
+        except SerializationError:
+            continue
+        assert False, data
+
+
+def test_truncated():
+    data = CFG(read_contract(CONTRACTS[1])).dumps()
+    for size in range(len(data)):
+        try:
+            CFG.loads(data[:size])
+        except SerializationError:
+            continue
+        assert False, size
+
+
+def test_corrupted():
+    data = CFG(read_contract(CONTRACTS[1])).dumps()
+    rng = random.Random(0)
+    for _ in range(200):
+        corrupted = bytearray(data)
+        idx = rng.randrange(CHECKSUM_END, len(data))
+        corrupted[idx] ^= 1 << rng.randrange(8)
+        # Caught by the checksum
+        try:
+            CFG.loads(bytes(corrupted))
+        except SerializationError:
+            pass
+        else:
+            assert False, idx
+        # Caught by the validation, or a valid CFG
+        try:
+            CFG.loads(_with_checksum(bytes(corrupted)))
+        except SerializationError:
+            pass
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
@@ -0,0 +1,82 @@
+'''
+    Signature database: lookups against the dict it replaced
+
+    Usage: python tests/test_signature_db.py
+'''
+import hashlib
+import os
+import random
+import tempfile
+
+from evm_cfg_builder.known_hashes.known_hashes import bundled_database, known_hashes
+from evm_cfg_builder.known_hashes.signature_db import SignatureDatabase, write_signature_db
+
+# Number of entries, and sha256 of repr(sorted(known_hashes.items())), of the
+# known_hashes dict before the database
+KNOWN_HASHES_COUNT = 88150
+KNOWN_HASHES_DIGEST = '49bde2269becddec79b46aa4a5bba7275b0df5156e5d8316d144f4f99c2764d2'
+
+
+def test_bundled_database():
+    assert len(bundled_database) == KNOWN_HASHES_COUNT
+    items = list(bundled_database.items())
+    assert hashlib.sha256(repr(items).encode()).hexdigest() == KNOWN_HASHES_DIGEST
+
+    for (selector, signature) in items[::97]:
+        assert bundled_database.lookup(selector) == signature
+
+    assert bundled_database.lookup(0xa9059cbb) == 'transfer(address,uint256)'
+    assert bundled_database.lookup(0x70a08231) == 'balanceOf(address)'
+    assert bundled_database.lookup(0x33) == 'matchTokenOrderByAdmin_k44j(uint256[])'
+    assert bundled_database.lookup(0xffffce47) == 'exchangeRateOracle()'
+
+    for selector in [0, 0x32, 0xffffffff, -1, 2**32]:
+        assert bundled_database.lookup(selector) is None
+        assert selector not in bundled_database
+
+
+def test_known_hashes():
+    assert known_hashes[0xa9059cbb] == 'transfer(address,uint256)'
+    assert known_hashes.materialized
+    assert len(known_hashes) == KNOWN_HASHES_COUNT
+    assert dict(known_hashes) == dict(bundled_database.items())
+
+
+def test_write_signature_db():
+    rng = random.Random(0)
+    signatures = {rng.randrange(2**32): 'f{}(uint256)'.format(i) for i in range(1000)}
+    signatures[0] = 'zero()'
+    signatures[0xffffffff] = 'max()'
+    signatures[0x12345678] = 'unicodé(string)'
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'signatures.db')
+        write_signature_db(path, signatures)
+        database = SignatureDatabase(path)
+
+        assert len(database) == len(signatures)
+        assert dict(database.items()) == signatures
+        for (selector, signature) in signatures.items():
+            assert database.lookup(selector) == signature
+        for _ in range(1000):
+            selector = rng.randrange(2**32)
+            assert database.lookup(selector) == signatures.get(selector)
+        database.close()
+
+
+def test_empty_database():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'empty.db')
+        write_signature_db(path, {})
+        database = SignatureDatabase(path)
+        assert len(database) == 0
+        assert database.lookup(0xa9059cbb) is None
+        assert list(database.items()) == []
+        database.close()
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))
@@ -0,0 +1,135 @@
+'''
+    SignatureResolver: precedence of the signature layers
+
+    Usage: python tests/test_signature_resolver.py
+'''
+import os
+import pickle
+import tempfile
+
+from evm_cfg_builder.cfg import CFG
+from evm_cfg_builder.known_hashes.known_hashes import known_hashes
+from evm_cfg_builder.known_hashes.resolver import SignatureResolver
+from evm_cfg_builder.known_hashes.signature_db import (SignatureDatabase, compile_signature_file,
+                                                       write_signature_db)
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+TRANSFER = 0xa9059cbb
+BALANCE_OF = 0x70a08231
+UNKNOWN = 0x00000001
+
+
+def test_bundled():
+    resolver = SignatureResolver()
+    assert resolver.lookup(TRANSFER) == 'transfer(address,uint256)'
+    assert resolver.lookup(UNKNOWN) is None
+    assert SignatureResolver(use_bundled=False).lookup(TRANSFER) is None
+
+
+def test_known_hashes_modified():
+    # The cached lookups follow the modifications of the compatibility view
+    resolver = SignatureResolver()
+    derived = resolver.derive({})
+    assert resolver.lookup(TRANSFER) == 'transfer(address,uint256)'
+    assert derived.lookup(UNKNOWN) is None
+    try:
+        known_hashes[TRANSFER] = 'modified_transfer()'
+        known_hashes[UNKNOWN] = 'unknown()'
+        assert resolver.lookup(TRANSFER) == 'modified_transfer()'
+        assert derived.lookup(UNKNOWN) == 'unknown()'
+        del known_hashes[UNKNOWN]
+        assert derived.lookup(UNKNOWN) is None
+    finally:
+        known_hashes[TRANSFER] = 'transfer(address,uint256)'
+        known_hashes.pop(UNKNOWN, None)
+    assert resolver.lookup(TRANSFER) == 'transfer(address,uint256)'
+
+
+def test_precedence():
+    first = {TRANSFER: 'first_transfer()', BALANCE_OF: 'first_balanceOf()'}
+    second = {TRANSFER: 'second_transfer()', UNKNOWN: 'second_unknown()'}
+    resolver = SignatureResolver(overrides={BALANCE_OF: 'override_balanceOf()'},
+                                 databases=[first, second])
+
+    # overrides, then the databases in order, then the bundled database
+    assert resolver.lookup(BALANCE_OF) == 'override_balanceOf()'
+    assert resolver.lookup(TRANSFER) == 'first_transfer()'
+    assert resolver.lookup(UNKNOWN) == 'second_unknown()'
+    assert resolver.lookup(0x18160ddd) == 'totalSupply()'
+
+    resolver.add_overrides({TRANSFER: 'override_transfer()'})
+    assert resolver.lookup(TRANSFER) == 'override_transfer()'
+
+
+def test_add_database():
+    resolver = SignatureResolver()
+    assert resolver.lookup(UNKNOWN) is None
+    resolver.add_database({UNKNOWN: 'added()', TRANSFER: 'added_transfer()'})
+    # The cached misses are dropped, and the bundled database comes last
+    assert resolver.lookup(UNKNOWN) == 'added()'
+    assert resolver.lookup(TRANSFER) == 'added_transfer()'
+
+
+def test_derive():
+    resolver = SignatureResolver(databases=[{UNKNOWN: 'database()'}])
+    derived = resolver.derive({UNKNOWN: 'derived()'})
+    assert derived.lookup(UNKNOWN) == 'derived()'
+    assert resolver.lookup(UNKNOWN) == 'database()'
+    assert derived.lookup(TRANSFER) == 'transfer(address,uint256)'
+
+
+def test_files():
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'signatures.db')
+        write_signature_db(db_path, {TRANSFER: 'database_transfer()'})
+
+        text_path = os.path.join(directory, 'signatures.txt')
+        with open(text_path, 'w') as f:
+            f.write('# comment\n\n0x70a08231 text_balanceOf()\n0xa9059cbb text_transfer()\n')
+
+        resolver = SignatureResolver(databases=[db_path, text_path])
+        assert resolver.lookup(TRANSFER) == 'database_transfer()'
+        assert resolver.lookup(BALANCE_OF) == 'text_balanceOf()'
+
+        # The resolver is sent to the worker processes
+        resolver = pickle.loads(pickle.dumps(resolver))
+        assert resolver.lookup(BALANCE_OF) == 'text_balanceOf()'
+
+
+def test_compile_signature_file():
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, 'signatures.txt')
+        with open(text_path, 'w') as f:
+            f.write('0x00000001 one()\n')
+
+        db_path = compile_signature_file(text_path, directory)
+        assert compile_signature_file(text_path, directory) == db_path
+        assert SignatureDatabase(db_path).lookup(UNKNOWN) == 'one()'
+
+        # A modified file is compiled again
+        with open(text_path, 'w') as f:
+            f.write('0x00000001 uno()\n')
+        stat = os.stat(text_path)
+        os.utime(text_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        new_db_path = compile_signature_file(text_path, directory)
+        assert new_db_path != db_path
+        assert SignatureDatabase(new_db_path).lookup(UNKNOWN) == 'uno()'
+
+
+def test_cfg_names():
+    with open(os.path.join(TESTS, 'fomo3d.evm')) as f:
+        bytecode = f.read()
+    resolver = SignatureResolver(overrides={TRANSFER: 'renamed(address,uint256)'})
+    cfg = CFG(bytecode, compute_cfgs=False, signature_resolver=resolver)
+    names = [function.name for function in cfg.functions]
+    assert 'renamed(address,uint256)' in names
+    assert 'transfer(address,uint256)' not in names
+    assert 'balanceOf(address)' in names
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print('{} passed'.format(name))